@@ -1,13 +1,17 @@
+import asyncio
 import os
 import sys
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection
 
 from alembic import context
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from database import create_db_engine  # noqa: E402
 from models import Base  # noqa: E402
+from settings import get_settings  # noqa: E402
 
 # access to the values within the .ini file in use.
 config = context.config
@@ -17,6 +21,12 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# DATABASE_URL from the environment (or .env, loaded by get_settings) wins
+# over sqlalchemy.url in alembic.ini
+settings = get_settings()
+if "DATABASE_URL" in os.environ:
+    config.set_main_option("sqlalchemy.url", settings.database_url.replace("%", "%%"))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
@@ -28,6 +38,20 @@ target_metadata = Base.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# Search index objects created by raw SQL in migrations (FTS5 table and its
+# shadow tables, pg_trgm indexes); autogenerate must not try to drop them.
+SEARCH_INDEX_PREFIXES = (
+    "rules_fts",
+    "ix_rules_rule_name_trgm",
+    "ix_rules_gateway_name_trgm",
+)
+
+
+def include_name(name, type_, parent_names):
+    if type_ in ("table", "index") and name and name.startswith(SEARCH_INDEX_PREFIXES):
+        return False
+    return True
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -47,30 +71,46 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
         context.run_migrations()
 
 
-def run_migrations_online() -> None:
-    """Run migrations in 'online' mode.
+def do_run_migrations(connection: Connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+    )
 
-    In this scenario we need to create an Engine
-    and associate a connection with the context.
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    """Run migrations through the application's engine factory.
+
+    The same driver and connect-time settings (SQLite PRAGMAs) are used
+    as by the app; pooling is disabled for the one-off connection.
 
     """
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
+    connectable = create_db_engine(
+        get_settings(),
+        config.get_main_option("sqlalchemy.url"),
         poolclass=pool.NullPool,
     )
 
-    with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+
+    await connectable.dispose()
 
-        with context.begin_transaction():
-            context.run_migrations()
+
+def run_migrations_online() -> None:
+    """Run migrations in 'online' mode."""
+    asyncio.run(run_async_migrations())
 
 
 if context.is_offline_mode():
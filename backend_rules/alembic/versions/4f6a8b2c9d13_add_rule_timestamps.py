@@ -0,0 +1,50 @@
+"""add rule timestamps
+
+Revision ID: 4f6a8b2c9d13
+Revises: 9e2b7d41f0c6
+Create Date: 2026-10-17 11:37:02.671148
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f6a8b2c9d13'
+down_revision: Union[str, Sequence[str], None] = '9e2b7d41f0c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rules', sa.Column('created_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('rules', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+
+    # Backfill through the DateTime type so existing rows get the same storage
+    # format the ORM writes (keyset pagination compares these values).
+    rules = sa.table(
+        'rules',
+        sa.column('created_at', sa.DateTime(timezone=True)),
+        sa.column('updated_at', sa.DateTime(timezone=True)),
+    )
+    now = datetime.now(timezone.utc)
+    op.execute(rules.update().values(created_at=now, updated_at=now))
+
+    with op.batch_alter_table('rules') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+        batch_op.create_index(batch_op.f('ix_rules_created_at'), ['created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_rules_updated_at'), ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('rules') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_rules_updated_at'))
+        batch_op.drop_index(batch_op.f('ix_rules_created_at'))
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('created_at')
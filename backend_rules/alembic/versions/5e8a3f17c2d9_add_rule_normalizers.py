@@ -0,0 +1,30 @@
+"""add rule normalizers
+
+Revision ID: 5e8a3f17c2d9
+Revises: 8c2f5e1d7a64
+Create Date: 2026-10-17 16:41:09.572318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8a3f17c2d9'
+down_revision: Union[str, Sequence[str], None] = '8c2f5e1d7a64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Plain ADD COLUMN: a batch migration would recreate "rules" and drop the
+    # FTS triggers on SQLite
+    op.add_column('rules', sa.Column('normalizers', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('rules', 'normalizers')
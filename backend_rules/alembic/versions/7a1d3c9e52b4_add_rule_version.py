@@ -0,0 +1,30 @@
+"""add rule version
+
+Revision ID: 7a1d3c9e52b4
+Revises: e4c06a782ace
+Create Date: 2026-10-17 09:12:41.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a1d3c9e52b4'
+down_revision: Union[str, Sequence[str], None] = 'e4c06a782ace'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('rules') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('rules') as batch_op:
+        batch_op.drop_column('version')
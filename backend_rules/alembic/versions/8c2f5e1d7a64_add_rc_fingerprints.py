@@ -0,0 +1,34 @@
+"""add rc fingerprints
+
+Revision ID: 8c2f5e1d7a64
+Revises: d71c4a9e3b58
+Create Date: 2026-10-17 16:05:48.120394
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2f5e1d7a64'
+down_revision: Union[str, Sequence[str], None] = 'd71c4a9e3b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('rc_fingerprints',
+    sa.Column('gateway_id', sa.Integer(), nullable=False),
+    sa.Column('rule_version', sa.Integer(), nullable=False),
+    sa.Column('fingerprint', sa.BigInteger(), nullable=False),
+    sa.Column('first_seen_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('gateway_id', 'rule_version', 'fingerprint')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('rc_fingerprints')
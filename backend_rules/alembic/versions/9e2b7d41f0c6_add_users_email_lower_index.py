@@ -0,0 +1,28 @@
+"""add users lower(email) index
+
+Revision ID: 9e2b7d41f0c6
+Revises: c58e0f4b1a93
+Create Date: 2026-10-17 10:48:55.216730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e2b7d41f0c6'
+down_revision: Union[str, Sequence[str], None] = 'c58e0f4b1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_email_lower', table_name='users')
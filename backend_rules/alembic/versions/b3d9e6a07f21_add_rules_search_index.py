@@ -0,0 +1,72 @@
+"""add rules search index
+
+Revision ID: b3d9e6a07f21
+Revises: 4f6a8b2c9d13
+Create Date: 2026-10-17 12:20:44.508391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d9e6a07f21'
+down_revision: Union[str, Sequence[str], None] = '4f6a8b2c9d13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # External-content FTS5 table: only the index is stored, rows come from rules.
+        # Triggers keep it in sync; note that batch migrations recreating "rules"
+        # drop these triggers and must recreate them.
+        op.execute(
+            "CREATE VIRTUAL TABLE rules_fts USING fts5("
+            "rule_name, gateway_name, content='rules', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER rules_fts_ai AFTER INSERT ON rules BEGIN "
+            "INSERT INTO rules_fts(rowid, rule_name, gateway_name) "
+            "VALUES (new.id, new.rule_name, new.gateway_name); END"
+        )
+        op.execute(
+            "CREATE TRIGGER rules_fts_ad AFTER DELETE ON rules BEGIN "
+            "INSERT INTO rules_fts(rules_fts, rowid, rule_name, gateway_name) "
+            "VALUES ('delete', old.id, old.rule_name, old.gateway_name); END"
+        )
+        op.execute(
+            "CREATE TRIGGER rules_fts_au AFTER UPDATE OF rule_name, gateway_name ON rules BEGIN "
+            "INSERT INTO rules_fts(rules_fts, rowid, rule_name, gateway_name) "
+            "VALUES ('delete', old.id, old.rule_name, old.gateway_name); "
+            "INSERT INTO rules_fts(rowid, rule_name, gateway_name) "
+            "VALUES (new.id, new.rule_name, new.gateway_name); END"
+        )
+        op.execute("INSERT INTO rules_fts(rules_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index(
+            'ix_rules_rule_name_trgm', 'rules', [sa.text('lower(rule_name) gin_trgm_ops')],
+            postgresql_using='gin',
+        )
+        op.create_index(
+            'ix_rules_gateway_name_trgm', 'rules', [sa.text('lower(gateway_name) gin_trgm_ops')],
+            postgresql_using='gin',
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS rules_fts_au')
+        op.execute('DROP TRIGGER IF EXISTS rules_fts_ad')
+        op.execute('DROP TRIGGER IF EXISTS rules_fts_ai')
+        op.execute('DROP TABLE IF EXISTS rules_fts')
+    elif dialect == 'postgresql':
+        op.drop_index('ix_rules_gateway_name_trgm', table_name='rules')
+        op.drop_index('ix_rules_rule_name_trgm', table_name='rules')
@@ -0,0 +1,33 @@
+"""add rules version
+
+Revision ID: c58e0f4b1a93
+Revises: 7a1d3c9e52b4
+Create Date: 2026-10-17 10:03:17.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c58e0f4b1a93'
+down_revision: Union[str, Sequence[str], None] = '7a1d3c9e52b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    rules_version = op.create_table('rules_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(rules_version, [{'id': 1, 'version': 0}])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('rules_version')
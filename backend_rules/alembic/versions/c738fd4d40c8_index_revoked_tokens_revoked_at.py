@@ -0,0 +1,27 @@
+"""index revoked tokens revoked at
+
+Revision ID: c738fd4d40c8
+Revises: f3b7d20a9c46
+Create Date: 2026-10-17 04:38:33.288012
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c738fd4d40c8'
+down_revision: Union[str, Sequence[str], None] = 'f3b7d20a9c46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_revoked_tokens_revoked_at'), 'revoked_tokens', ['revoked_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_revoked_tokens_revoked_at'), table_name='revoked_tokens')
@@ -0,0 +1,73 @@
+"""add rule changes
+
+Revision ID: d71c4a9e3b58
+Revises: b3d9e6a07f21
+Create Date: 2026-10-17 14:21:09.553817
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd71c4a9e3b58'
+down_revision: Union[str, Sequence[str], None] = 'b3d9e6a07f21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    rule_changes = op.create_table('rule_changes',
+    sa.Column('version', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('gateway_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(length=10), nullable=False),
+    sa.Column('rule', sa.JSON(), nullable=True),
+    sa.Column('changed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('version')
+    )
+
+    # Seed the feed with one upsert per existing rule, each under a fresh
+    # global version, so a consumer reading from since=0 sees every rule.
+    rules = sa.table(
+        'rules',
+        sa.column('id', sa.Integer()),
+        sa.column('gateway_id', sa.Integer()),
+        sa.column('gateway_name', sa.String()),
+        sa.column('rule_name', sa.String()),
+        sa.column('enabled', sa.Boolean()),
+        sa.column('composite_key', sa.JSON()),
+        sa.column('field_paths', sa.JSON()),
+        sa.column('tolerance', sa.JSON()),
+        sa.column('version', sa.Integer()),
+        sa.column('created_at', sa.DateTime(timezone=True)),
+        sa.column('updated_at', sa.DateTime(timezone=True)),
+    )
+    rules_version = sa.table(
+        'rules_version', sa.column('id', sa.Integer()), sa.column('version', sa.Integer())
+    )
+    conn = op.get_bind()
+    version = conn.scalar(sa.select(rules_version.c.version).where(rules_version.c.id == 1)) or 0
+    now = datetime.now(timezone.utc)
+    changes = []
+    for row in conn.execute(sa.select(rules).order_by(rules.c.id)).mappings().all():
+        version += 1
+        conn.execute(rules.update().where(rules.c.id == row['id']).values(version=version))
+        rule = {
+            **row,
+            'version': version,
+            'created_at': row['created_at'].isoformat() if row['created_at'] else None,
+            'updated_at': row['updated_at'].isoformat() if row['updated_at'] else None,
+        }
+        changes.append({'version': version, 'gateway_id': row['gateway_id'], 'op': 'upsert', 'rule': rule, 'changed_at': now})
+    if changes:
+        op.bulk_insert(rule_changes, changes)
+        conn.execute(rules_version.update().where(rules_version.c.id == 1).values(version=version))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('rule_changes')
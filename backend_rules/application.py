@@ -0,0 +1,74 @@
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+import extractors
+from auth_routes import auth_router
+from change_feed import change_notifier
+from database import dispose_engine, init_engine, new_session
+from metrics import MetricsMiddleware, instrument_engines, metrics_router
+from password_pool import password_pool
+from principal_cache import principal_cache
+from ratelimit import login_rate_limiter
+from revocation import revocation_list
+from rule_cache import rule_cache
+from rules_routes import rules_router
+from settings import Settings, use_settings
+
+logger = logging.getLogger(__name__)
+
+
+def _configure(settings: Settings) -> None:
+    # Process-wide singletons follow the settings of the app being built
+    use_settings(settings)
+    rule_cache.check_interval = settings.rule_cache_check_seconds
+    rule_cache.clear()
+    principal_cache.max_size = settings.principal_cache_size
+    principal_cache.ttl = settings.principal_cache_ttl_seconds
+    principal_cache.clear()
+    password_pool.configure(settings.bcrypt_workers, settings.bcrypt_max_pending)
+    login_rate_limiter.configure(settings)
+    change_notifier.poll_interval = settings.change_feed_poll_seconds
+    revocation_list.check_interval = settings.revocation_check_seconds
+    revocation_list.overlap = settings.revocation_overlap_seconds
+    revocation_list.clear()
+
+
+async def warm_up() -> None:
+    # Enabled rules into the rule cache and their compiled extractors, so the
+    # first requests of a new worker do not all miss
+    async with new_session() as session:
+        rules = await rule_cache.warm_up(session)
+    for rule in rules:
+        extractors.get_compiled(rule)
+    logger.info("Rule cache warmed up with %d rules", len(rules))
+
+
+def create_app(settings: Settings | None = None) -> FastAPI:
+    # Nothing touches the database or spawns threads here; the engine is
+    # created in the lifespan (or on first use when no lifespan runs).
+    settings = settings or Settings.from_env()
+    _configure(settings)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        init_engine(settings)
+        if settings.rule_cache_warm_up:
+            await warm_up()
+        try:
+            yield
+        finally:
+            password_pool.shutdown()
+            await dispose_engine()
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.settings = settings
+    app.include_router(auth_router)
+    app.include_router(rules_router)
+
+    if settings.metrics_enabled:
+        instrument_engines()
+        app.add_middleware(MetricsMiddleware)
+        app.include_router(metrics_router)
+    return app
@@ -1,52 +1,85 @@
 from datetime import datetime, timedelta, timezone
+from uuid import uuid4
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.security import OAuth2PasswordRequestForm
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials, OAuth2PasswordRequestForm
 from jose import ExpiredSignatureError, JWTError, jwt
-from sqlalchemy import func
-from sqlalchemy.orm import Session  # noqa: F401
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from dependecy import create_session, token_verify
-from main import (
-    ACCESS_TOKEN_EXPIRE_MINUTES,
-    ALGORITHM,
-    SECRET_KEY,
-    hash_password,
-    verify_password,
-)
-from models import User, db_engine  # noqa: F401
-from schema import LoginSchema, UserSchema
+from models import User
+from password_pool import password_pool
+from principal_cache import Principal, principal_cache
+from ratelimit import login_rate_limiter
+from revocation import revocation_list
+from schema import LoginSchema, LogoutSchema, UserSchema
+from security import needs_rehash, oauth2_refresh_scheme, oauth2_scheme
+from settings import get_settings
 
 auth_router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+ACCESS, REFRESH = "access", "refresh"
+
+
 def create_token(
-    email: str,
-    duration_time: timedelta | int = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    email: str, duration_time: timedelta | None = None, token_type: str = ACCESS
 ) -> str:
-    expire_datetime = datetime.now(timezone.utc) + duration_time  # type: ignore
-
-    dic_info = {"sub_email": email, "exp": expire_datetime}
-    encoded_jwt = jwt.encode(dic_info, SECRET_KEY, ALGORITHM)  # type: ignore
+    settings = get_settings()
+    if duration_time is None:
+        if token_type == REFRESH:
+            duration_time = timedelta(days=settings.refresh_token_expire_days)
+        else:
+            duration_time = timedelta(minutes=settings.access_token_expire_minutes)
+    now = datetime.now(timezone.utc)
+
+    # jti identifies the token in revoked_tokens
+    dic_info = {
+        "sub_email": email,
+        "exp": now + duration_time,
+        "iat": now,
+        "jti": uuid4().hex,
+        "token_type": token_type,
+    }
+    encoded_jwt = jwt.encode(dic_info, settings.secret_key, settings.algorithm)  # type: ignore
     return encoded_jwt
 
 
-def user_authenticate(email: str, password: str, session: Session) -> User | bool:
+async def user_authenticate(
+    email: str, password: str, session: AsyncSession, client_ip: str | None = None
+) -> User | bool:
+    # Throttled before the lookup and bcrypt; raises 429 when over the limit
+    await login_rate_limiter.check(email, client_ip)
     email_normalized = email.strip().lower()
-    user = (
-        session.query(User).filter(func.lower(User.email) == email_normalized).first()
-    )  # type: ignore
+    user = await session.scalar(
+        select(User).where(func.lower(User.email) == email_normalized).limit(1)
+    )
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):  # type: ignore
+    if not await password_pool.verify(password, user.hashed_password):  # type: ignore
         return False
+    if needs_rehash(user.hashed_password):  # type: ignore
+        user.hashed_password = await password_pool.hash(password)  # type: ignore
+        await session.commit()
     return user  # type: ignore
 
 
+def _client_ip(request: Request) -> str | None:
+    # Behind a proxy, run uvicorn with --proxy-headers (and
+    # --forwarded-allow-ips) so this is the real client from X-Forwarded-For
+    return request.client.host if request.client else None
+
+
 def decode_refresh(token: str) -> dict:
     # igual ao decode acima, mas exigindo token_type="refresh"
+    settings = get_settings()
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])  # type: ignore
+        payload = jwt.decode(
+            token,
+            settings.secret_key,  # type: ignore
+            algorithms=[settings.algorithm],
+        )
     except ExpiredSignatureError:
         raise HTTPException(
             401, "Refresh token expired", headers={"WWW-Authenticate": "Bearer"}
@@ -55,7 +88,7 @@ def decode_refresh(token: str) -> dict:
         raise HTTPException(
             401, "Invalid refresh token", headers={"WWW-Authenticate": "Bearer"}
         )
-    if payload.get("token_type") != "refresh":
+    if payload.get("token_type") != REFRESH:
         raise HTTPException(
             401, "Wrong token type", headers={"WWW-Authenticate": "Bearer"}
         )
@@ -66,17 +99,17 @@ def decode_refresh(token: str) -> dict:
 async def register_user(
     user_in: UserSchema,
     current_user: UserSchema = Depends(token_verify),
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
 ):
     if not current_user.admin:  # type: ignore
         raise HTTPException(status_code=403, detail="Admin access required")
     email_normalized = user_in.email.strip().lower()
-    user = (
-        session.query(User).filter(func.lower(User.email) == email_normalized).first()
-    )  # type: ignore
+    user = await session.scalar(
+        select(User).where(func.lower(User.email) == email_normalized).limit(1)
+    )
     if user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    crypted_password = hash_password(user_in.hashed_password)
+    crypted_password = await password_pool.hash(user_in.hashed_password)
     user_in = User(
         username=user_in.username,
         email=email_normalized,
@@ -84,19 +117,24 @@ async def register_user(
         admin=user_in.admin,  # type: ignore
     )
     session.add(user_in)
-    session.commit()
+    await session.commit()
+    principal_cache.invalidate_email(email_normalized)
     return {"message": f"User '{email_normalized}' registered successfully "}
 
 
 @auth_router.post("/login")
 async def login_user(
-    login_schema: LoginSchema, session: Session = Depends(create_session)
+    login_schema: LoginSchema,
+    request: Request,
+    session: AsyncSession = Depends(create_session),
 ):
-    user = user_authenticate(login_schema.email, login_schema.password, session)
+    user = await user_authenticate(
+        login_schema.email, login_schema.password, session, _client_ip(request)
+    )
     if not user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
     access_token = create_token(user.email)  # type: ignore
-    refresh_token = create_token(user.email, duration_time=timedelta(days=7))  # type: ignore
+    refresh_token = create_token(user.email, token_type=REFRESH)  # type: ignore
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
@@ -105,21 +143,75 @@ async def login_user(
 
 
 @auth_router.post("/refresh-token")
-async def refresh_token(user: User = Depends(token_verify)):
-    access_token = create_token(user.email)  # type: ignore
+async def refresh_token(
+    credentials: HTTPAuthorizationCredentials = Depends(oauth2_refresh_scheme),
+    session: AsyncSession = Depends(create_session),
+):
+    # Rotation: every refresh token is revoked when used and replaced by a new
+    # one, so a stolen token works at most once
+    payload = decode_refresh(credentials.credentials)
+    jti = payload.get("jti")
+    email = (payload.get("sub_email") or "").strip()
+    await revocation_list.sync(session)
+    if not jti or not email or revocation_list.is_revoked(jti):
+        raise HTTPException(
+            401, "Refresh token revoked", headers={"WWW-Authenticate": "Bearer"}
+        )
+    user_email = await session.scalar(
+        select(User.email).where(func.lower(User.email) == email.lower()).limit(1)
+    )
+    if not user_email:
+        raise HTTPException(
+            401, "User not found", headers={"WWW-Authenticate": "Bearer"}
+        )
+    if not await revocation_list.revoke(session, jti, payload["exp"]):
+        # Used concurrently by another request (or worker)
+        raise HTTPException(
+            401, "Refresh token revoked", headers={"WWW-Authenticate": "Bearer"}
+        )
+    await session.commit()
     return {
-        "access_token": access_token,
+        "access_token": create_token(user_email),
+        "refresh_token": create_token(user_email, token_type=REFRESH),
         "token_type": "Bearer",
     }
 
 
+@auth_router.post("/logout")
+async def logout(
+    logout_schema: LogoutSchema | None = None,
+    token: str = Depends(oauth2_scheme),
+    user: Principal = Depends(token_verify),
+    session: AsyncSession = Depends(create_session),
+):
+    # Revokes the access token of the request and, when sent, the refresh token
+    settings = get_settings()
+    payload = jwt.decode(
+        token,
+        settings.secret_key,  # type: ignore
+        algorithms=[settings.algorithm],
+    )
+    await revocation_list.revoke(session, payload["jti"], payload["exp"])
+    if logout_schema and logout_schema.refresh_token:
+        refresh = decode_refresh(logout_schema.refresh_token)
+        if (refresh.get("sub_email") or "").strip().lower() != user.email.lower():
+            raise HTTPException(status_code=403, detail="Refresh token of another user")
+        if refresh.get("jti"):
+            await revocation_list.revoke(session, refresh["jti"], refresh["exp"])
+    await session.commit()
+    return {"message": "Logged out"}
+
+
 # FASTAPI ACCESS
 @auth_router.post("/login-form")
 async def login_form(
+    request: Request,
     form: OAuth2PasswordRequestForm = Depends(),
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
 ):
-    user = user_authenticate(form.username, form.password, session)
+    user = await user_authenticate(
+        form.username, form.password, session, _client_ip(request)
+    )
     if not user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
     access_token = create_token(user.email)  # type: ignore
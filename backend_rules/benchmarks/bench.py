@@ -0,0 +1,366 @@
+"""Benchmark the auth and rules endpoints against a seeded SQLite database.
+
+Run from backend_rules/:
+
+    python -m benchmarks.bench --users 1000 --rules 5000 --output before.json
+    python -m benchmarks.bench --mode uvicorn --workers 2 --scenario get_rule
+
+Each run uses a fresh temporary database. Results are printed (or written)
+as JSON: throughput plus p50/p95/p99 latency per scenario.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    # (rng, sequence number) -> (path, json body or None)
+    request: Callable[[random.Random, int], tuple[str, Any]]
+    auth: bool = True
+    write: bool = False
+
+
+def build_scenarios(rules: int) -> list[Scenario]:
+    from benchmarks.seed import ADMIN_EMAIL, PASSWORD, rule_payload
+
+    deep_offset = max(rules - 50, 0)
+
+    def gateway(rng: random.Random) -> int:
+        return rng.randint(1, max(rules, 1))
+
+    def update_request(rng: random.Random, n: int) -> tuple[str, Any]:
+        gateway_id = gateway(rng)
+        return f"/rules/rule-update/{gateway_id}", rule_payload(gateway_id, rng)
+
+    return [
+        Scenario(
+            "login",
+            "POST",
+            lambda rng, n: (
+                "/auth/login",
+                {"email": ADMIN_EMAIL, "password": PASSWORD},
+            ),
+            auth=False,
+        ),
+        Scenario(
+            "get_rule", "GET", lambda rng, n: (f"/rules/get-rules/{gateway(rng)}", None)
+        ),
+        Scenario("list_rules", "GET", lambda rng, n: ("/rules?limit=25", None)),
+        Scenario(
+            "list_rules_no_total",
+            "GET",
+            lambda rng, n: ("/rules?limit=25&include_total=false", None),
+        ),
+        Scenario(
+            "list_rules_q",
+            "GET",
+            lambda rng, n: (
+                f"/rules?limit=25&q={rng.choice(['pix', 'card', 'gateway 1'])}",
+                None,
+            ),
+        ),
+        Scenario(
+            "list_rules_deep_offset",
+            "GET",
+            lambda rng, n: (
+                f"/rules?limit=25&include_total=false&offset={deep_offset}",
+                None,
+            ),
+        ),
+        Scenario(
+            "batch_rules",
+            "GET",
+            lambda rng, n: (
+                "/rules/batch?gateway_ids="
+                + ",".join(str(gateway(rng)) for _ in range(100)),
+                None,
+            ),
+        ),
+        Scenario(
+            "insert_rule",
+            "POST",
+            # Fresh gateway IDs above the seeded range
+            lambda rng, n: ("/rules/insert-rule", rule_payload(rules + 1 + n, rng)),
+            write=True,
+        ),
+        Scenario(
+            "update_rule",
+            "PUT",
+            update_request,
+            write=True,
+        ),
+        Scenario(
+            "rule_status",
+            "PATCH",
+            lambda rng, n: (
+                f"/rules/rule-status/{gateway(rng)}?enabled={'true' if n % 2 else 'false'}",
+                None,
+            ),
+            write=True,
+        ),
+    ]
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    # pct * n first: pct / 100 * n overshoots for e.g. p99.9 with n=1000
+    rank = max(math.ceil(pct * len(sorted_values) / 100) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+async def run_scenario(
+    client,
+    scenario: Scenario,
+    token: str,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    seed: int,
+) -> dict:
+    rng = random.Random(seed)
+    headers = {"Authorization": f"Bearer {token}"} if scenario.auth else {}
+    latencies: list[float] = []
+    errors = 0
+    counter = 0
+
+    async def one(record: bool) -> None:
+        nonlocal counter, errors
+        n = counter
+        counter += 1
+        path, body = scenario.request(rng, n)
+        start = time.perf_counter()
+        response = await client.request(
+            scenario.method, path, json=body, headers=headers
+        )
+        elapsed = time.perf_counter() - start
+        if record:
+            latencies.append(elapsed)
+            if response.status_code >= 400:
+                errors += 1
+
+    for _ in range(warmup):
+        await one(record=False)
+
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await one(record=True)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ms = 1000.0
+    return {
+        "scenario": scenario.name,
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "seconds": round(wall, 4),
+        "rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * ms, 3),
+        "p95_ms": round(percentile(latencies, 95) * ms, 3),
+        "p99_ms": round(percentile(latencies, 99) * ms, 3),
+        "max_ms": round(latencies[-1] * ms, 3) if latencies else 0.0,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_ready(
+    client, process: subprocess.Popen, timeout: float = 30
+) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+        try:
+            await client.get("/openapi.json")
+            return
+        except Exception:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn did not start in time")
+
+
+async def main_async(args: argparse.Namespace) -> dict:
+    import httpx
+    from alembic.config import Config
+
+    from alembic import command
+    from auth_routes import create_token
+    from benchmarks.seed import ADMIN_EMAIL, seed
+
+    config = Config(str(APP_DIR / "alembic.ini"))
+    await asyncio.to_thread(command.upgrade, config, "head")
+    await seed(args.users, args.rules, args.seed)
+    token = create_token(ADMIN_EMAIL)
+
+    scenarios = build_scenarios(args.rules)
+    if args.scenario:
+        unknown = set(args.scenario) - {s.name for s in scenarios}
+        if unknown:
+            raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        scenarios = [s for s in scenarios if s.name in args.scenario]
+    if args.skip_writes:
+        scenarios = [s for s in scenarios if not s.write]
+
+    process = None
+    if args.mode == "asgi":
+        from main import app
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench"
+        )
+    else:
+        port = free_port()
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "main:app",
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(port),
+                "--workers",
+                str(args.workers),
+                "--log-level",
+                "warning",
+            ],
+            cwd=APP_DIR,
+            env=os.environ.copy(),
+        )
+        client = httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}",
+            limits=httpx.Limits(max_connections=args.concurrency),
+        )
+
+    results = []
+    try:
+        if process is not None:
+            await wait_until_ready(client, process)
+        for scenario in scenarios:
+            # bcrypt bound; fewer requests keep the run short
+            requests = (
+                max(args.requests // 10, 10)
+                if scenario.name == "login"
+                else args.requests
+            )
+            results.append(
+                await run_scenario(
+                    client,
+                    scenario,
+                    token,
+                    requests,
+                    args.concurrency,
+                    args.warmup,
+                    args.seed,
+                )
+            )
+            print(f"{scenario.name}: {results[-1]['rps']} req/s", file=sys.stderr)
+    finally:
+        await client.aclose()
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mode": args.mode,
+            "workers": args.workers if args.mode == "uvicorn" else 1,
+            "users": args.users,
+            "rules": args.rules,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "bcrypt_rounds": int(os.environ["BCRYPT_ROUNDS"]),
+        },
+        "results": results,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=APP_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--rules", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=500, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument(
+        "--scenario", action="append", help="run only these (repeatable)"
+    )
+    parser.add_argument("--skip-writes", action="store_true")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="rules-bench-") as tmp:
+        # Must be set before any app module is imported: they read the
+        # environment at import time.
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        os.environ.setdefault("SECRET_KEY", "bench-secret")
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+        # The login scenario reuses one account; measure bcrypt, not the limiter
+        os.environ.setdefault("LOGIN_RATE_LIMIT_ENABLED", "false")
+        sys.path.insert(0, str(APP_DIR))
+        report = asyncio.run(main_async(args))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
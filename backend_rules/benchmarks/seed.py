@@ -0,0 +1,67 @@
+import random
+
+from sqlalchemy import insert, update
+
+from database import new_session
+from models import Rule, RulesVersion, User
+from schema import RuleSchema
+from security import hash_password
+
+ADMIN_EMAIL = "bench-admin@example.com"
+PASSWORD = "bench-password"
+RULE_NAMES = list(RuleSchema.RULE_NAME_DEFINITIONS)
+GATEWAY_WORDS = ("pix", "boleto", "card", "wallet", "ted", "bank", "crypto", "voucher")
+
+
+def rule_payload(gateway_id: int, rng: random.Random) -> dict:
+    rule_name = rng.choice(RULE_NAMES)
+    composite_key = RuleSchema.RULE_NAME_DEFINITIONS[rule_name]
+    return {
+        "gateway_id": gateway_id,
+        "gateway_name": f"{rng.choice(GATEWAY_WORDS)} gateway {gateway_id}",
+        "rule_name": rule_name,
+        "enabled": rng.random() > 0.1,
+        "composite_key": list(composite_key),
+        "field_paths": {f: f"payment_information.{f}" for f in composite_key},
+        "tolerance": None,
+    }
+
+
+async def seed(users: int, rules: int, seed: int = 0) -> None:
+    # Expects a migrated, empty database. Every user shares one bcrypt hash;
+    # hashing thousands of passwords would dominate the setup time.
+    rng = random.Random(seed)
+    hashed = hash_password(PASSWORD)
+    async with new_session() as session:
+        await session.execute(
+            insert(User),
+            [
+                {
+                    "username": "bench-admin",
+                    "email": ADMIN_EMAIL,
+                    "hashed_password": hashed,
+                    "admin": True,
+                }
+            ]
+            + [
+                {
+                    "username": f"bench-user-{i}",
+                    "email": f"bench-user-{i}@example.com",
+                    "hashed_password": hashed,
+                    "admin": False,
+                }
+                for i in range(1, users)
+            ],
+        )
+        if rules:
+            await session.execute(
+                insert(Rule),
+                [
+                    {**rule_payload(gateway_id, rng), "version": gateway_id}
+                    for gateway_id in range(1, rules + 1)
+                ],
+            )
+        await session.execute(
+            update(RulesVersion).where(RulesVersion.id == 1).values(version=rules)
+        )
+        await session.commit()
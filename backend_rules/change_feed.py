@@ -0,0 +1,110 @@
+import asyncio
+import time
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import new_session
+from models import Rule, RuleChange
+from schema import RuleChangeOut, RuleOut
+from settings import DEFAULT_SETTINGS
+
+
+def record_change(
+    session: AsyncSession, version: int, gateway_id: int, snapshot: RuleOut | None
+) -> None:
+    # Same transaction as the rule write; snapshot None records a delete
+    session.add(
+        RuleChange(
+            version=version,
+            gateway_id=gateway_id,
+            op="delete" if snapshot is None else "upsert",
+            rule=None if snapshot is None else snapshot.model_dump(mode="json"),
+        )
+    )
+
+
+async def record_changes(session: AsyncSession, rules: Sequence[Rule]) -> None:
+    if not rules:
+        return
+    await session.execute(
+        insert(RuleChange),
+        [
+            {
+                "version": rule.version,
+                "gateway_id": rule.gateway_id,
+                "op": "upsert",
+                "rule": RuleOut.model_validate(rule).model_dump(mode="json"),
+            }
+            for rule in rules
+        ],
+    )
+
+
+async def changes_since(
+    session: AsyncSession, since: int, limit: int
+) -> list[RuleChangeOut]:
+    rows = await session.scalars(
+        select(RuleChange)
+        .where(RuleChange.version > since)
+        .order_by(RuleChange.version)
+        .limit(limit)
+    )
+    return [RuleChangeOut.model_validate(row) for row in rows]
+
+
+class ChangeNotifier:
+    # Wakes waiting feed requests on local commits. Writes from other workers
+    # are only seen by re-querying every CHANGE_FEED_POLL_SECONDS.
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._event: asyncio.Event | None = None
+
+    def _current(self) -> asyncio.Event:
+        # Events belong to one loop; a new loop (e.g. test clients) starts fresh
+        loop = asyncio.get_running_loop()
+        if self._event is None or self._loop is not loop:
+            self._loop, self._event = loop, asyncio.Event()
+        return self._event
+
+    def notify(self) -> None:
+        event = self._current()
+        self._event = asyncio.Event()
+        event.set()
+
+    async def wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._current().wait(), timeout)
+        except TimeoutError:
+            pass
+
+    async def poll(
+        self, since: int, limit: int, max_wait: float
+    ) -> list[RuleChangeOut]:
+        # Short sessions per check, so no connection is held while waiting
+        deadline = time.monotonic() + max_wait
+        while True:
+            async with new_session() as session:
+                changes = await changes_since(session, since, limit)
+            remaining = deadline - time.monotonic()
+            if changes or remaining <= 0:
+                return changes
+            await self.wait(min(self.poll_interval, remaining))
+
+    async def follow(
+        self, since: int, limit: int, heartbeat: float
+    ) -> AsyncIterator[list[RuleChangeOut]]:
+        # Endless poll for SSE; an empty list means nothing new for a heartbeat
+        while True:
+            changes = await self.poll(since, limit, heartbeat)
+            if changes:
+                since = changes[-1].version
+            yield changes
+
+
+# Tuned by create_app from the app's settings
+change_notifier = ChangeNotifier(
+    poll_interval=DEFAULT_SETTINGS.change_feed_poll_seconds
+)
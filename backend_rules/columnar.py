@@ -0,0 +1,160 @@
+from array import array
+from datetime import date
+from typing import Any, Callable, Iterable
+
+from extractors import CompiledRule
+from matching import MatchResult, Tolerance, band_join_keys, hash_join_keys
+from normalizers import NORMALIZE_ERRORS
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_INT64 = 1 << 63
+
+# Column type per canonical field: amounts in integer cents, dates in days
+# since 1970-01-01, everything else as StringDictionary codes.
+_TYPECODES = {"amount": "q", "date": "i"}
+
+
+class StringDictionary:
+    # Normalized strings <-> dense integer codes. Batches that are compared
+    # with each other must share one dictionary.
+    __slots__ = ("codes", "values")
+
+    def __init__(self):
+        self.codes: dict[str, int] = {}
+        self.values: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def _cents_encoder(normalize: Callable[[Any], Any]) -> Callable[[Any], int]:
+    def encode(value: Any) -> int:
+        cents = int(normalize(value).scaleb(2))
+        if not -_INT64 <= cents < _INT64:
+            raise OverflowError(f"Amount out of range: {value!r}")
+        return cents
+
+    return encode
+
+
+def _day_encoder(normalize: Callable[[Any], Any]) -> Callable[[Any], int]:
+    def encode(value: Any) -> int:
+        return normalize(value).toordinal() - EPOCH_ORDINAL
+
+    return encode
+
+
+def _code_encoder(
+    normalize: Callable[[Any], Any], dictionary: StringDictionary
+) -> Callable[[Any], int]:
+    def encode(value: Any) -> int:
+        return dictionary.encode(normalize(value))
+
+    return encode
+
+
+class ColumnBatch:
+    # The composite-key fields of a rule projected out of a batch of documents
+    # into typed arrays, one per field; the documents themselves are not kept.
+    # Rows that cannot be extracted or normalized hold 0 and valid[row] == 0.
+    __slots__ = ("composite_key", "dictionary", "columns", "valid")
+
+    def __init__(
+        self, composite_key: Iterable[str], dictionary: StringDictionary | None = None
+    ):
+        self.composite_key = tuple(composite_key)
+        self.dictionary = dictionary if dictionary is not None else StringDictionary()
+        self.columns = tuple(array(_TYPECODES.get(f, "i")) for f in self.composite_key)
+        self.valid = bytearray()
+
+    @classmethod
+    def from_docs(
+        cls,
+        compiled: CompiledRule,
+        docs: Iterable[Any],
+        dictionary: StringDictionary | None = None,
+    ) -> "ColumnBatch":
+        batch = cls(compiled.composite_key, dictionary)
+        batch.extend(compiled, docs)
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    @property
+    def nbytes(self) -> int:
+        # Columns and validity flags; the shared dictionary is not counted
+        return len(self.valid) + sum(c.itemsize * len(c) for c in self.columns)
+
+    def _encoders(self, compiled: CompiledRule) -> tuple[Callable[[Any], int], ...]:
+        encoders = []
+        for name, normalize in zip(self.composite_key, compiled.normalizers):
+            if name == "amount":
+                encoders.append(_cents_encoder(normalize))
+            elif name == "date":
+                encoders.append(_day_encoder(normalize))
+            else:
+                encoders.append(_code_encoder(normalize, self.dictionary))
+        return tuple(encoders)
+
+    def extend(self, compiled: CompiledRule, docs: Iterable[Any]) -> None:
+        # Documents are consumed one at a time, so a generator over a file
+        # never holds more than one of them in memory.
+        if tuple(compiled.composite_key) != self.composite_key:
+            raise ValueError("Rule composite_key does not match the batch")
+        encoders = self._encoders(compiled)
+        columns = self.columns
+        invalid = (0,) * len(columns)
+        valid = self.valid
+        extract = compiled.extract
+        for doc in docs:
+            values = extract(doc)
+            row = None
+            if values is not None:
+                try:
+                    row = tuple(encode(v) for encode, v in zip(encoders, values))
+                except (*NORMALIZE_ERRORS, OverflowError):
+                    row = None
+            valid.append(row is not None)
+            if row is None:
+                row = invalid
+            for column, value in zip(columns, row):
+                column.append(value)
+
+    def keys(self) -> list[tuple | None]:
+        # Encoded keys (tuples of ints): equal exactly when the normalized keys
+        # are, provided both batches share the dictionary
+        return [key if ok else None for key, ok in zip(zip(*self.columns), self.valid)]
+
+
+def _identity(value: int) -> int:
+    return value
+
+
+def match_columns(rule: Any, rcs: ColumnBatch, payments: ColumnBatch) -> MatchResult:
+    # Same semantics as matching.match, over encoded keys; the result holds row
+    # numbers of rcs and payments instead of documents.
+    if rcs.dictionary is not payments.dictionary:
+        raise ValueError("Batches must share a StringDictionary")
+    rc_rows = range(len(rcs))
+    pay_rows = range(len(payments))
+    tolerance = Tolerance.from_rule(rule.tolerance)
+    if tolerance.is_exact:
+        return hash_join_keys(rc_rows, rcs.keys(), pay_rows, payments.keys())
+    return band_join_keys(
+        rcs.composite_key,
+        tolerance,
+        rc_rows,
+        rcs.keys(),
+        pay_rows,
+        payments.keys(),
+        cents=_identity,
+        day=_identity,
+    )
@@ -0,0 +1,84 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from settings import Settings, get_settings
+
+
+def async_url(url: str) -> str:
+    # Same database, async driver: aiosqlite for SQLite, asyncpg for Postgres
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith(("postgresql://", "postgres://")):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    return url
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def create_db_engine(
+    settings: Settings, url: str | None = None, **kwargs
+) -> AsyncEngine:
+    # kwargs override the profile, e.g. poolclass=NullPool for alembic
+    url = url or settings.database_url
+    options: dict = {}
+    if not is_sqlite(url) and "poolclass" not in kwargs:
+        options = {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_recycle": settings.db_pool_recycle_seconds,
+            "pool_pre_ping": settings.db_pool_pre_ping,
+        }
+    options.update(kwargs)
+    engine = create_async_engine(async_url(url), **options)
+
+    if is_sqlite(url):
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute(
+                    f"PRAGMA busy_timeout = {settings.sqlite_busy_timeout_ms}"
+                )
+                cursor.execute(f"PRAGMA journal_mode = {settings.sqlite_journal_mode}")
+                cursor.execute(f"PRAGMA synchronous = {settings.sqlite_synchronous}")
+                cursor.execute(f"PRAGMA mmap_size = {settings.sqlite_mmap_size}")
+                cursor.execute(f"PRAGMA cache_size = {settings.sqlite_cache_size}")
+            finally:
+                cursor.close()
+
+    return engine
+
+
+# Created on first use (or by the app's lifespan), never at import time, so
+# forked workers each open their own connections.
+_engine: AsyncEngine | None = None
+_sessionmaker: async_sessionmaker[AsyncSession] | None = None
+
+
+def init_engine(settings: Settings | None = None) -> AsyncEngine:
+    global _engine, _sessionmaker
+    if _engine is None:
+        _engine = create_db_engine(settings or get_settings())
+        _sessionmaker = async_sessionmaker(_engine, expire_on_commit=False)
+    return _engine
+
+
+def new_session() -> AsyncSession:
+    if _sessionmaker is None:
+        init_engine()
+    return _sessionmaker()  # type: ignore
+
+
+async def dispose_engine() -> None:
+    global _engine, _sessionmaker
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = _sessionmaker = None
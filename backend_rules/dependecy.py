@@ -2,32 +2,53 @@
 
 from fastapi import Depends, HTTPException
 from jose import ExpiredSignatureError, JWTError, jwt
-from sqlalchemy import func
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from main import ALGORITHM, SECRET_KEY, oauth2_scheme
-from models import User, db_engine
+from database import new_session
+from metrics import jwt_decode_seconds
+from models import User
+from principal_cache import Principal, principal_cache
+from revocation import revocation_list
+from security import oauth2_scheme
+from settings import get_settings
 
 
-def create_session():
-    try:
-        Session = sessionmaker(bind=db_engine)
-        session = Session()
+async def create_session():
+    async with new_session() as session:
         yield session
-    finally:
-        session.close()
 
 
-def token_verify(
+async def _check_revoked(session: AsyncSession, jti: str | None) -> None:
+    # In-memory set lookup; reads revoked_tokens at most every
+    # revocation_check_seconds to pick up other workers' revocations
+    await revocation_list.sync(session)
+    if revocation_list.is_revoked(jti):
+        raise HTTPException(
+            status_code=401,
+            detail="Token revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+async def token_verify(
     token: str = Depends(oauth2_scheme),
-    session: Session = Depends(create_session),
-):
+    session: AsyncSession = Depends(create_session),
+) -> Principal:
+    cached = principal_cache.get(token)
+    if cached is not None:
+        principal, jti = cached
+        await _check_revoked(session, jti)
+        return principal
+
+    settings = get_settings()
     try:
-        payload = jwt.decode(
-            token,
-            SECRET_KEY,  # type: ignore
-            algorithms=[ALGORITHM],
-        )
+        with jwt_decode_seconds.time():
+            payload = jwt.decode(
+                token,
+                settings.secret_key,  # type: ignore
+                algorithms=[settings.algorithm],
+            )
     except ExpiredSignatureError:
         raise HTTPException(
             status_code=401,
@@ -43,6 +64,14 @@ def token_verify(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if payload.get("token_type") != "access":
+        raise HTTPException(
+            status_code=401,
+            detail="Wrong token type",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    await _check_revoked(session, payload.get("jti"))
+
     # aceita 'sub_email' (seu padrão) ou 'sub' (padrão comum)
     user_email = (payload.get("sub_email") or payload.get("sub") or "").strip()
     if not user_email:
@@ -52,8 +81,8 @@ def token_verify(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = (
-        session.query(User).filter(func.lower(User.email) == user_email.lower()).first()
+    user = await session.scalar(
+        select(User).where(func.lower(User.email) == user_email.lower()).limit(1)
     )
     if not user:
         raise HTTPException(
@@ -61,4 +90,6 @@ def token_verify(
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.put(token, principal, payload.get("exp"), payload.get("jti"))
+    return principal
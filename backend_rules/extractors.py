@@ -0,0 +1,154 @@
+from threading import Lock
+from typing import Any, Callable, Iterable, Mapping, Sequence
+
+from normalizers import rule_normalizers
+
+# Marker for an absent field. None and "" in the document also count as absent
+# so the next fallback path gets a chance.
+MISSING: Any = object()
+
+Getter = Callable[[Any], Any]
+
+
+def split_paths(paths: str | Sequence[str]) -> tuple[str, ...]:
+    if isinstance(paths, str):
+        paths = [paths]
+    cleaned = tuple(p.strip() for p in paths if p and p.strip())
+    if not cleaned:
+        raise ValueError("field path cannot be empty")
+    return cleaned
+
+
+def compile_path(path: str) -> Getter:
+    # Pre-split once: each segment keeps its list index (if numeric) so the
+    # getter never parses strings while walking a document.
+    segments = tuple(
+        (key, int(key) if key.lstrip("-").isdigit() else None)
+        for key in path.split(".")
+    )
+
+    if len(segments) == 1:
+        key = segments[0][0]
+
+        def get_single(doc: Any) -> Any:
+            if type(doc) is not dict:
+                return MISSING
+            value = doc.get(key, MISSING)
+            if value is None or value == "":
+                return MISSING
+            return value
+
+        return get_single
+
+    def get(doc: Any) -> Any:
+        value = doc
+        for key, index in segments:
+            if type(value) is dict:
+                value = value.get(key, MISSING)
+                if value is MISSING:
+                    return MISSING
+            elif index is not None and type(value) is list:
+                if not -len(value) <= index < len(value):
+                    return MISSING
+                value = value[index]
+            else:
+                return MISSING
+        if value is None or value == "":
+            return MISSING
+        return value
+
+    return get
+
+
+def compile_field(paths: str | Sequence[str]) -> Getter:
+    getters = tuple(compile_path(p) for p in split_paths(paths))
+    if len(getters) == 1:
+        return getters[0]
+
+    def get_with_fallback(doc: Any) -> Any:
+        for getter in getters:
+            value = getter(doc)
+            if value is not MISSING:
+                return value
+        return MISSING
+
+    return get_with_fallback
+
+
+class CompiledRule:
+    __slots__ = ("gateway_id", "version", "composite_key", "getters", "normalizers")
+
+    def __init__(
+        self,
+        gateway_id: int,
+        version: int,
+        composite_key: Sequence[str],
+        field_paths: dict,
+        normalizers: Mapping[str, str] | None = None,
+    ):
+        missing = [f for f in composite_key if f not in field_paths]
+        if missing:
+            raise ValueError(
+                f"field_paths missing mappings for: {', '.join(sorted(missing))}"
+            )
+        self.gateway_id = gateway_id
+        self.version = version
+        self.composite_key = tuple(composite_key)
+        self.getters = tuple(compile_field(field_paths[f]) for f in composite_key)
+        self.normalizers = rule_normalizers(composite_key, normalizers)
+
+    def extract(self, doc: Any) -> tuple | None:
+        values = []
+        for getter in self.getters:
+            value = getter(doc)
+            if value is MISSING:
+                return None
+            values.append(value)
+        return tuple(values)
+
+    def missing_fields(self, doc: Any) -> list[str]:
+        return [
+            field
+            for field, getter in zip(self.composite_key, self.getters)
+            if getter(doc) is MISSING
+        ]
+
+
+# One compiled rule per gateway; the rule version tells whether it is current.
+_compiled: dict[int, CompiledRule] = {}
+_compiled_lock = Lock()
+
+
+def get_compiled(rule: Any) -> CompiledRule:
+    gateway_id = rule.gateway_id
+    version = rule.version or 0
+    compiled = _compiled.get(gateway_id)
+    if compiled is not None and compiled.version == version:
+        return compiled
+    with _compiled_lock:
+        compiled = _compiled.get(gateway_id)
+        if compiled is None or compiled.version != version:
+            compiled = CompiledRule(
+                gateway_id,
+                version,
+                rule.composite_key,
+                rule.field_paths,
+                getattr(rule, "normalizers", None),
+            )
+            _compiled[gateway_id] = compiled
+    return compiled
+
+
+def invalidate(gateway_id: int | None = None) -> None:
+    with _compiled_lock:
+        if gateway_id is None:
+            _compiled.clear()
+        else:
+            _compiled.pop(gateway_id, None)
+
+
+def extract_keys(rule: Any, docs: Iterable[Any]) -> list[tuple | None]:
+    # Batch API: the rule is resolved once and the per-document work is only
+    # the pre-compiled getters. Documents missing any key field yield None.
+    extract = get_compiled(rule).extract
+    return [extract(doc) for doc in docs]
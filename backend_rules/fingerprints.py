@@ -0,0 +1,144 @@
+from datetime import date, datetime
+from decimal import Decimal
+from hashlib import blake2b
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import RcFingerprint, utcnow
+
+# Rows per statement; keeps bound parameters under SQLite's limit (32766)
+CHUNK_SIZE = 5000
+
+# Unit separator between key parts, so ("ab", "c") and ("a", "bc") differ
+_SEPARATOR = b"\x1f"
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, Decimal):
+        return format(value, "f").encode()
+    if isinstance(value, date):
+        return value.isoformat().encode()
+    return str(value).encode()
+
+
+def fingerprint(key: Sequence[Any]) -> int:
+    # 8-byte blake2b of a normalized composite key, as a signed 64-bit integer
+    # (fits BIGINT). Collisions are ~n²/2^65; negligible per gateway/version.
+    digest = blake2b(_SEPARATOR.join(_encode(v) for v in key), digest_size=8)
+    return int.from_bytes(digest.digest(), "big", signed=True)
+
+
+def fingerprint_keys(keys: Iterable[Sequence[Any] | None]) -> list[int | None]:
+    return [None if key is None else fingerprint(key) for key in keys]
+
+
+def _chunks(values: list[int]) -> Iterable[list[int]]:
+    for start in range(0, len(values), CHUNK_SIZE):
+        yield values[start : start + CHUNK_SIZE]
+
+
+async def lookup(
+    session: AsyncSession,
+    gateway_id: int,
+    rule_version: int,
+    fingerprints: Iterable[int],
+) -> set[int]:
+    # Fingerprints already recorded; one indexed IN query per chunk
+    wanted = list(dict.fromkeys(fingerprints))
+    found: set[int] = set()
+    for chunk in _chunks(wanted):
+        rows = await session.scalars(
+            select(RcFingerprint.fingerprint).where(
+                RcFingerprint.gateway_id == gateway_id,
+                RcFingerprint.rule_version == rule_version,
+                RcFingerprint.fingerprint.in_(chunk),
+            )
+        )
+        found.update(rows)
+    return found
+
+
+def _rows(
+    gateway_id: int, rule_version: int, fingerprints: Iterable[int], now: datetime
+) -> list[dict]:
+    return [
+        {
+            "gateway_id": gateway_id,
+            "rule_version": rule_version,
+            "fingerprint": fp,
+            "first_seen_at": now,
+        }
+        for fp in fingerprints
+    ]
+
+
+async def _insert_missing(
+    session: AsyncSession,
+    gateway_id: int,
+    rule_version: int,
+    chunk: list[int],
+    now: datetime,
+) -> set[int]:
+    # Portable path for dialects without ON CONFLICT: look up, then insert
+    # the rest in a savepoint. A concurrent writer that got there first
+    # makes the chunk fail; it is then retried row by row.
+    present = await lookup(session, gateway_id, rule_version, chunk)
+    missing = [fp for fp in chunk if fp not in present]
+    if not missing:
+        return set()
+    try:
+        async with session.begin_nested():
+            await session.execute(
+                insert(RcFingerprint), _rows(gateway_id, rule_version, missing, now)
+            )
+        return set(missing)
+    except IntegrityError:
+        pass
+    inserted = set()
+    for fp in missing:
+        try:
+            async with session.begin_nested():
+                await session.execute(
+                    insert(RcFingerprint), _rows(gateway_id, rule_version, [fp], now)
+                )
+            inserted.add(fp)
+        except IntegrityError:
+            continue
+    return inserted
+
+
+async def insert_or_lookup(
+    session: AsyncSession,
+    gateway_id: int,
+    rule_version: int,
+    fingerprints: Iterable[int],
+) -> set[int]:
+    # Records every fingerprint and returns those that were already present.
+    # INSERT .. ON CONFLICT DO NOTHING RETURNING reports only the rows this
+    # call inserted, so concurrent callers never both see a key as new.
+    # Runs in the caller's transaction; commit to persist.
+    wanted = list(dict.fromkeys(fingerprints))
+    now = utcnow()
+    inserted: set[int] = set()
+    dialect = session.bind.dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        for chunk in _chunks(wanted):
+            inserted |= await _insert_missing(
+                session, gateway_id, rule_version, chunk, now
+            )
+        return set(wanted) - inserted
+
+    dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    table = RcFingerprint.__table__
+    stmt = dialect_insert(table).on_conflict_do_nothing().returning(table.c.fingerprint)
+    for chunk in _chunks(wanted):
+        # executemany; SQLAlchemy batches it into multi-row INSERTs
+        result = await session.execute(
+            stmt, _rows(gateway_id, rule_version, chunk, now)
+        )
+        inserted.update(result.scalars())
+    return set(wanted) - inserted
@@ -0,0 +1,300 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from typing import Any, Callable, Iterable, Sequence
+
+from extractors import CompiledRule, get_compiled
+from normalizers import NORMALIZE_ERRORS, normalize_many
+
+
+def normalized_keys(compiled: CompiledRule, docs: Sequence[Any]) -> list[tuple | None]:
+    # Column at a time through the batch API: repeated values within the batch
+    # are normalized once. A key is None when any of its fields fails.
+    extracted = [compiled.extract(doc) for doc in docs]
+    rows = [values for values in extracted if values is not None]
+    columns = [
+        normalize_many(normalize, values)
+        for normalize, values in zip(compiled.normalizers, zip(*rows))
+    ]
+    normalized = zip(*columns)
+    keys = [None if values is None else next(normalized) for values in extracted]
+    return [None if key is None or None in key else key for key in keys]
+
+
+def explain_failure(compiled: CompiledRule, doc: Any) -> str:
+    missing = compiled.missing_fields(doc)
+    if missing:
+        return f"Missing fields: {', '.join(missing)}"
+    fields = zip(compiled.composite_key, compiled.getters, compiled.normalizers)
+    for name, getter, normalize in fields:
+        value = getter(doc)
+        try:
+            normalize(value)
+        except NORMALIZE_ERRORS:
+            return f"Invalid value for {name}: {value!r}"
+    return "Key could not be extracted"
+
+
+def payment_extractor(rule: Any, payment_paths: dict | None = None) -> CompiledRule:
+    # Payments default to canonical field names at the top level of the record.
+    composite_key = list(rule.composite_key)
+    paths = payment_paths or {f: f for f in composite_key}
+    return CompiledRule(
+        rule.gateway_id,
+        rule.version or 0,
+        composite_key,
+        paths,
+        getattr(rule, "normalizers", None),
+    )
+
+
+@dataclass(slots=True)
+class MatchResult:
+    matched: list[tuple[Any, Any]] = field(default_factory=list)
+    unmatched_rcs: list[Any] = field(default_factory=list)
+    unmatched_payments: list[Any] = field(default_factory=list)
+    # Keys shared by more than one RC and/or more than one payment
+    ambiguous: list[tuple[list[Any], list[Any]]] = field(default_factory=list)
+
+
+def _group(
+    docs: Sequence[Any], keys: list[tuple | None], unmatched: list[Any]
+) -> dict[tuple, list[Any]]:
+    groups: dict[tuple, list[Any]] = {}
+    for doc, key in zip(docs, keys):
+        if key is None:
+            unmatched.append(doc)
+            continue
+        bucket = groups.get(key)
+        if bucket is None:
+            groups[key] = [doc]
+        else:
+            bucket.append(doc)
+    return groups
+
+
+def hash_join_keys(
+    rcs: Sequence[Any],
+    rc_keys: list[tuple | None],
+    payments: Sequence[Any],
+    pay_keys: list[tuple | None],
+) -> MatchResult:
+    # Items are opaque (documents, row numbers...); only the keys are compared
+    result = MatchResult()
+
+    # Build side: payments indexed by normalized composite key.
+    index = _group(payments, pay_keys, result.unmatched_payments)
+
+    # Probe side: RCs grouped too, so duplicates on either side are ambiguous.
+    rc_groups = _group(rcs, rc_keys, result.unmatched_rcs)
+
+    for key, rc_group in rc_groups.items():
+        pay_group = index.pop(key, None)
+        if pay_group is None:
+            result.unmatched_rcs.extend(rc_group)
+        elif len(rc_group) == 1 and len(pay_group) == 1:
+            result.matched.append((rc_group[0], pay_group[0]))
+        else:
+            result.ambiguous.append((rc_group, pay_group))
+
+    for pay_group in index.values():
+        result.unmatched_payments.extend(pay_group)
+    return result
+
+
+def hash_join(
+    rule: Any,
+    rcs: Iterable[Any],
+    payments: Iterable[Any],
+    payment_paths: dict | None = None,
+) -> MatchResult:
+    rcs = rcs if isinstance(rcs, list) else list(rcs)
+    payments = payments if isinstance(payments, list) else list(payments)
+    pay_keys = normalized_keys(payment_extractor(rule, payment_paths), payments)
+    rc_keys = normalized_keys(get_compiled(rule), rcs)
+    return hash_join_keys(rcs, rc_keys, payments, pay_keys)
+
+
+@dataclass(slots=True, frozen=True)
+class Tolerance:
+    date_window_days: int = 0
+    amount_mode: str = "abs"
+    amount_value: Decimal = Decimal(0)
+
+    @classmethod
+    def from_rule(cls, tolerance: dict | None) -> "Tolerance":
+        # Ex.: {"date_window_days": 2, "amount": {"mode": "pct", "value": 1.0}}
+        tolerance = tolerance or {}
+        amount = tolerance.get("amount") or {}
+        mode = amount.get("mode", "abs")
+        if mode not in ("abs", "pct"):
+            raise ValueError(f"Unsupported amount tolerance mode: {mode}")
+        window = int(tolerance.get("date_window_days") or 0)
+        value = Decimal(str(amount.get("value") or 0))
+        if window < 0 or value < 0:
+            raise ValueError("Tolerance values cannot be negative")
+        return cls(window, mode, value)
+
+    @property
+    def is_exact(self) -> bool:
+        return self.date_window_days == 0 and self.amount_value == 0
+
+    def amount_delta(self, cents: int) -> int:
+        if self.amount_mode == "pct":
+            return int(abs(cents) * self.amount_value / 100)
+        return int(self.amount_value * 100)
+
+
+class _BandIndex:
+    # Payments of one exact-key group, sorted by amount in cents. Amount bands
+    # are two binary searches; the date window is checked only inside the band.
+    __slots__ = ("amounts", "days", "docs")
+
+    def __init__(self, rows: list[tuple[int, int, Any]]):
+        rows.sort(key=lambda row: row[0])
+        self.amounts = array("q", [row[0] for row in rows])
+        self.days = array("l", [row[1] for row in rows])
+        self.docs = [row[2] for row in rows]
+
+    def candidates(self, cents: int, day: int, delta: int, window: int) -> list[int]:
+        lo = bisect_left(self.amounts, cents - delta)
+        hi = bisect_right(self.amounts, cents + delta, lo)
+        days = self.days
+        return [j for j in range(lo, hi) if -window <= days[j] - day <= window]
+
+
+def _resolve_band(
+    rc_rows: list[tuple[int, int, Any]],
+    index: _BandIndex,
+    tolerance: Tolerance,
+    result: MatchResult,
+) -> None:
+    window = tolerance.date_window_days
+    cands = [
+        index.candidates(cents, day, tolerance.amount_delta(cents), window)
+        for cents, day, _ in rc_rows
+    ]
+    claims = [0] * len(index.docs)
+    for cs in cands:
+        for j in cs:
+            claims[j] += 1
+
+    # Union-find over RC nodes [0, n) and payment nodes [n, n + m) so that
+    # overlapping ambiguous candidates are reported as one group.
+    n = len(rc_rows)
+    parent = list(range(n + len(index.docs)))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    ambiguous_rcs = []
+    for i, cs in enumerate(cands):
+        doc = rc_rows[i][2]
+        if not cs:
+            result.unmatched_rcs.append(doc)
+        elif len(cs) == 1 and claims[cs[0]] == 1:
+            result.matched.append((doc, index.docs[cs[0]]))
+        else:
+            ambiguous_rcs.append(i)
+            for j in cs:
+                parent[find(n + j)] = find(i)
+
+    components: dict[int, tuple[list[Any], list[Any]]] = {}
+    for i in ambiguous_rcs:
+        components.setdefault(find(i), ([], []))[0].append(rc_rows[i][2])
+    for j, count in enumerate(claims):
+        if count == 0:
+            result.unmatched_payments.append(index.docs[j])
+            continue
+        component = components.get(find(n + j))
+        if component is not None:
+            component[1].append(index.docs[j])
+    result.ambiguous.extend(components.values())
+
+
+def _decimal_cents(amount: Decimal) -> int:
+    return int(amount * 100)
+
+
+def band_join_keys(
+    composite_key: Sequence[str],
+    tolerance: Tolerance,
+    rcs: Sequence[Any],
+    rc_keys: list[tuple | None],
+    payments: Sequence[Any],
+    pay_keys: list[tuple | None],
+    cents: Callable[[Any], int] = _decimal_cents,
+    day: Callable[[Any], int] = date.toordinal,
+) -> MatchResult:
+    # cents/day turn the amount and date key values into integers; the
+    # defaults take normalized keys (Decimal, date)
+    result = MatchResult()
+    composite_key = list(composite_key)
+    amount_pos = composite_key.index("amount") if "amount" in composite_key else None
+    date_pos = composite_key.index("date") if "date" in composite_key else None
+    exact_pos = tuple(
+        i for i in range(len(composite_key)) if i != amount_pos and i != date_pos
+    )
+
+    def bucket(
+        docs: Sequence[Any], keys: list[tuple | None], unmatched: list[Any]
+    ) -> dict[tuple, list[tuple[int, int, Any]]]:
+        groups: dict[tuple, list[tuple[int, int, Any]]] = {}
+        for doc, key in zip(docs, keys):
+            if key is None:
+                unmatched.append(doc)
+                continue
+            exact = tuple(key[i] for i in exact_pos)
+            row = (
+                cents(key[amount_pos]) if amount_pos is not None else 0,
+                day(key[date_pos]) if date_pos is not None else 0,
+                doc,
+            )
+            groups.setdefault(exact, []).append(row)
+        return groups
+
+    pay_groups = bucket(payments, pay_keys, result.unmatched_payments)
+    rc_groups = bucket(rcs, rc_keys, result.unmatched_rcs)
+
+    for exact, rc_rows in rc_groups.items():
+        pay_rows = pay_groups.pop(exact, None)
+        if pay_rows is None:
+            result.unmatched_rcs.extend(row[2] for row in rc_rows)
+        else:
+            _resolve_band(rc_rows, _BandIndex(pay_rows), tolerance, result)
+
+    for pay_rows in pay_groups.values():
+        result.unmatched_payments.extend(row[2] for row in pay_rows)
+    return result
+
+
+def band_join(
+    rule: Any,
+    rcs: Iterable[Any],
+    payments: Iterable[Any],
+    payment_paths: dict | None = None,
+) -> MatchResult:
+    rcs = rcs if isinstance(rcs, list) else list(rcs)
+    payments = payments if isinstance(payments, list) else list(payments)
+    tolerance = Tolerance.from_rule(rule.tolerance)
+    pay_keys = normalized_keys(payment_extractor(rule, payment_paths), payments)
+    rc_keys = normalized_keys(get_compiled(rule), rcs)
+    return band_join_keys(
+        rule.composite_key, tolerance, rcs, rc_keys, payments, pay_keys
+    )
+
+
+def match(
+    rule: Any,
+    rcs: Iterable[Any],
+    payments: Iterable[Any],
+    payment_paths: dict | None = None,
+) -> MatchResult:
+    if Tolerance.from_rule(rule.tolerance).is_exact:
+        return hash_join(rule, rcs, payments, payment_paths)
+    return band_join(rule, rcs, payments, payment_paths)
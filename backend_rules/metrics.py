@@ -0,0 +1,259 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from threading import Lock
+from typing import Iterator
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; roughly the Prometheus client defaults
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, description: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Per label set: one count per bucket (+Inf last), then the sum
+        self._series: dict[tuple[str, ...], list[float]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        names = self.labelnames + ("le",)
+        bounds = [repr(b) for b in self.buckets] + ["+Inf"]
+        for labels, series in items:
+            cumulative = 0
+            for le, count in zip(bounds, series):
+                cumulative += int(count)
+                lines.append(
+                    f"{self.name}_bucket{_labels(names, labels + (le,))} {cumulative}"
+                )
+            base = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{base} {series[-1]}")
+            lines.append(f"{self.name}_count{base} {cumulative}")
+        return lines
+
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route"),
+)
+http_responses = Counter(
+    "http_responses_total",
+    "HTTP responses by route and status",
+    ("method", "route", "status"),
+)
+http_request_queries = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per request",
+    ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+http_request_db_seconds = Histogram(
+    "http_request_db_seconds",
+    "Time spent in SQL statements per request",
+    ("method", "route"),
+)
+db_query_seconds = Histogram(
+    "db_query_duration_seconds", "Duration of individual SQL statements"
+)
+bcrypt_seconds = Histogram(
+    "bcrypt_duration_seconds",
+    "bcrypt work time, excluding time queued for the thread pool",
+    ("op",),
+)
+jwt_decode_seconds = Histogram(
+    "jwt_decode_duration_seconds", "jwt.decode time in token_verify"
+)
+login_throttled = Counter(
+    "login_throttled_total",
+    "Login attempts rejected by the rate limiter, by bucket",
+    ("scope",),
+)
+
+REGISTRY = (
+    http_request_seconds,
+    http_responses,
+    http_request_queries,
+    http_request_db_seconds,
+    db_query_seconds,
+    bcrypt_seconds,
+    jwt_decode_seconds,
+    login_throttled,
+)
+
+
+@dataclass(slots=True)
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+
+
+# Set by the middleware for the request being served. SQLAlchemy runs async
+# drivers in greenlets that inherit the caller's context, so engine events
+# see the right request.
+_request_stats: ContextVar[RequestStats | None] = ContextVar(
+    "request_stats", default=None
+)
+
+
+_instrumented = False
+
+
+def instrument_engines() -> None:
+    # Class-level listeners: cover engines created later (lazily, per worker)
+    global _instrumented
+    if _instrumented:
+        return
+    _instrumented = True
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        db_query_seconds.observe(elapsed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+
+def render() -> bytes:
+    lines: list[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return ("\n".join(lines) + "\n").encode()
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            # Route template, not the raw path, to keep label cardinality bounded
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_request_seconds.observe(elapsed, method, path)
+            http_responses.inc(method, path, str(status))
+            http_request_queries.observe(stats.queries, method, path)
+            http_request_db_seconds.observe(stats.db_seconds, method, path)
+
+
+metrics_router = APIRouter(tags=["metrics"])
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(render(), media_type="text/plain; version=0.0.4")
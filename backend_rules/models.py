@@ -1,19 +1,27 @@
+from datetime import datetime, timezone
+
 from sqlalchemy import (
     JSON,
+    BigInteger,
     Boolean,
     Column,
+    DateTime,
+    Float,
+    Index,
     Integer,
     String,
     UniqueConstraint,
-    create_engine,
+    func,
 )
 from sqlalchemy.orm import declarative_base
 
-db_engine = create_engine("sqlite:///banco.db")
-
 Base = declarative_base()
 
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -23,6 +31,9 @@ class User(Base):
     hashed_password = Column("hashed_password", String, nullable=False)
     admin = Column("admin", Boolean, default=False)
 
+    # Permite que os lookups por func.lower(User.email) usem índice
+    __table_args__ = (Index("ix_users_email_lower", func.lower(email)),)
+
     def __init__(
         self, username: str, email: str, hashed_password: str, admin: bool = False
     ):
@@ -48,7 +59,7 @@ class Rule(Base):
     # Ex.: ["document", "amount", "date"]
     composite_key = Column("composite_key", JSON, nullable=False)
 
-    # Mapeamento canônico -> paths no JSON do RC (com fallback)
+    # Mapeamento canônico -> path (ou lista ordenada de paths de fallback) no JSON do RC
     # Ex.: {"document": ["payment_information.user_document_number", "payment_information.reference_1"], ...}
     field_paths = Column("field_paths", JSON, nullable=False)
 
@@ -56,6 +67,32 @@ class Rule(Base):
     # Ex.: {"date_window_days": 2, "amount": {"mode": "pct", "value": 1.0}}
     tolerance = Column("tolerance", JSON, nullable=True)
 
+    # Normalizador por campo canônico (registro em normalizers.py); campos
+    # ausentes usam o padrão do campo
+    # Ex.: {"date": "date_us", "amount": "amount_br"}
+    normalizers = Column("normalizers", JSON, nullable=True)
+
+    # Versão global (rules_version) da última alteração; chave dos caches
+    version = Column("version", Integer, nullable=False, default=1, server_default="1")
+
+    # Preenchidos pelo ORM (mesmo formato em todas as linhas, o que a paginação
+    # por cursor exige); indexados para ordenação
+    created_at = Column(
+        "created_at",
+        DateTime(timezone=True),
+        nullable=False,
+        default=utcnow,
+        index=True,
+    )
+    updated_at = Column(
+        "updated_at",
+        DateTime(timezone=True),
+        nullable=False,
+        default=utcnow,
+        onupdate=utcnow,
+        index=True,
+    )
+
     def __init__(
         self,
         gateway_id: int,
@@ -65,6 +102,7 @@ class Rule(Base):
         composite_key: list,
         field_paths: dict,
         tolerance: dict | None = None,
+        normalizers: dict | None = None,
     ):
         self.gateway_id = gateway_id
         self.gateway_name = gateway_name
@@ -73,3 +111,69 @@ class Rule(Base):
         self.composite_key = composite_key
         self.field_paths = field_paths
         self.tolerance = tolerance
+        self.normalizers = normalizers
+
+
+class RulesVersion(Base):
+    # Linha única (id=1) com a versão global das regras, incrementada a cada
+    # escrita; os workers comparam com o cache local para saber se está válido
+    __tablename__ = "rules_version"
+
+    id = Column("id", Integer, primary_key=True)
+    version = Column("version", Integer, nullable=False, default=0)
+
+
+class RuleChange(Base):
+    # Log append-only das escritas em rules: uma linha por regra alterada, com
+    # a versão global (rules_version) atribuída à alteração como chave
+    __tablename__ = "rule_changes"
+
+    version = Column("version", Integer, primary_key=True, autoincrement=False)
+    gateway_id = Column("gateway_id", Integer, nullable=False)
+    op = Column("op", String(10), nullable=False)  # "upsert" ou "delete"
+    # RuleOut serializado após a alteração; null em delete
+    rule = Column("rule", JSON, nullable=True)
+    changed_at = Column(
+        "changed_at", DateTime(timezone=True), nullable=False, default=utcnow
+    )
+
+
+class RcFingerprint(Base):
+    # Hash de 8 bytes (blake2b, com sinal) da chave composta normalizada de um
+    # RC já visto. A PK composta é o índice usado na detecção de duplicados.
+    __tablename__ = "rc_fingerprints"
+
+    gateway_id = Column("gateway_id", Integer, primary_key=True)
+    rule_version = Column("rule_version", Integer, primary_key=True)
+    fingerprint = Column("fingerprint", BigInteger, primary_key=True)
+    first_seen_at = Column(
+        "first_seen_at", DateTime(timezone=True), nullable=False, default=utcnow
+    )
+
+
+class RevokedToken(Base):
+    # Tokens revogados antes de expirar (logout, rotação de refresh). Cada
+    # worker relê as revogações recentes por revoked_at (indexado).
+    __tablename__ = "revoked_tokens"
+
+    id = Column("id", Integer, primary_key=True, autoincrement=True)
+    jti = Column("jti", String(64), nullable=False, unique=True)
+    # Claim exp do token (epoch em segundos); depois disso a linha pode sair
+    expires_at = Column("expires_at", BigInteger, nullable=False, index=True)
+    revoked_at = Column(
+        "revoked_at",
+        DateTime(timezone=True),
+        nullable=False,
+        default=utcnow,
+        index=True,
+    )
+
+
+class RateLimitBucket(Base):
+    # Token bucket de login compartilhado entre workers (backend "db");
+    # chave "email:<email>" ou "ip:<ip>", updated_at em epoch (segundos)
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column("key", String(320), primary_key=True)
+    tokens = Column("tokens", Float, nullable=False)
+    updated_at = Column("updated_at", Float, nullable=False, index=True)
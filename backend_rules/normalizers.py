@@ -0,0 +1,202 @@
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Mapping, Sequence
+
+CENTS = Decimal("0.01")
+# Amounts are matched as signed 64-bit integer cents
+MAX_AMOUNT = Decimal(1 << 63).scaleb(-2)
+# Distinct values remembered per memoized normalizer
+MEMO_SIZE = 65536
+
+# Raised by normalizers for values that cannot be normalized
+NORMALIZE_ERRORS = (ValueError, TypeError, InvalidOperation)
+
+# What a normalizer returns; fields that feed tolerances need a fixed kind
+AMOUNT, DATE, TEXT = "amount", "date", "text"
+FIELD_KINDS = {"amount": AMOUNT, "date": DATE}
+
+
+@dataclass(frozen=True, slots=True)
+class Normalizer:
+    name: str
+    kind: str
+    func: Callable[[Any], Any]
+
+
+REGISTRY: dict[str, Normalizer] = {}
+
+
+def _memoize(func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    # typed: 1 and 1.0 are different inputs ("1" vs "1.0" as text)
+    cached = lru_cache(maxsize=MEMO_SIZE, typed=True)(func)
+
+    def call(value: Any) -> Any:
+        try:
+            return cached(value)
+        except TypeError:
+            if isinstance(value, (list, dict)):
+                return func(value)
+            raise
+
+    call.cache_info = cached.cache_info  # type: ignore[attr-defined]
+    call.cache_clear = cached.cache_clear  # type: ignore[attr-defined]
+    return call
+
+
+def register(
+    name: str, kind: str = TEXT, memoize: bool = False
+) -> Callable[[Callable[[Any], Any]], Callable[[Any], Any]]:
+    def decorator(func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        wrapped = _memoize(func) if memoize else func
+        REGISTRY[name] = Normalizer(name, kind, wrapped)
+        return wrapped
+
+    return decorator
+
+
+@register("text")
+def normalize_text(value: Any) -> str:
+    return str(value).strip().casefold()
+
+
+_NON_ALNUM = re.compile(r"[\W_]+")
+
+
+@register("document", memoize=True)
+def normalize_document(value: Any) -> str:
+    # CPF/CNPJ, bank accounts: "012.345.678-90" -> "1234567890"
+    cleaned = _NON_ALNUM.sub("", str(value)).casefold()
+    if not cleaned:
+        raise ValueError(f"Empty document: {value!r}")
+    return cleaned.lstrip("0") or "0"
+
+
+def _to_cents(amount: Decimal) -> Decimal:
+    # quantize lets NaN through; those and out-of-range amounts cannot match
+    if amount.is_finite():
+        amount = amount.quantize(CENTS)
+        if abs(amount) < MAX_AMOUNT:
+            return amount
+    raise ValueError(f"Amount out of range: {amount}")
+
+
+@register("amount", kind=AMOUNT)
+def normalize_amount(value: Any) -> Decimal:
+    if isinstance(value, float):
+        value = repr(value)
+    return _to_cents(Decimal(str(value).strip()))
+
+
+_CURRENCY = re.compile(r"[^\d,.\-]")
+
+
+@register("amount_br", kind=AMOUNT, memoize=True)
+def normalize_amount_br(value: Any) -> Decimal:
+    # "R$ 1.234,56" -> 1234.56; numbers (not strings) as in "amount"
+    if not isinstance(value, str):
+        return normalize_amount(value)
+    cleaned = _CURRENCY.sub("", value).replace(".", "").replace(",", ".")
+    return _to_cents(Decimal(cleaned))
+
+
+# Tried in order after ISO 8601; day first, as in our exports
+DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y/%m/%d", "%Y%m%d")
+US_DATE_FORMATS = ("%m/%d/%Y", "%m-%d-%Y", "%Y/%m/%d", "%Y%m%d")
+
+
+def _parse_date(value: Any, formats: Sequence[str]) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    try:
+        return datetime.fromisoformat(text).date()
+    except ValueError:
+        pass
+    # Time of day, if any, is ignored
+    day = text.split("T", 1)[0].split(" ", 1)[0]
+    for fmt in formats:
+        try:
+            return datetime.strptime(day, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date: {value!r}")
+
+
+@register("date", kind=DATE, memoize=True)
+def normalize_date(value: Any) -> date:
+    return _parse_date(value, DATE_FORMATS)
+
+
+@register("date_us", kind=DATE, memoize=True)
+def normalize_date_us(value: Any) -> date:
+    return _parse_date(value, US_DATE_FORMATS)
+
+
+# Normalizer per canonical field when the rule does not configure one
+FIELD_DEFAULTS = {
+    "amount": "amount",
+    "date": "date",
+    "document": "document",
+    "bank_account": "document",
+}
+
+
+def field_normalizer(field: str, name: str | None = None) -> Callable[[Any], Any]:
+    return REGISTRY[name or FIELD_DEFAULTS.get(field, "text")].func
+
+
+def rule_normalizers(
+    composite_key: Sequence[str], configured: Mapping[str, str] | None = None
+) -> tuple[Callable[[Any], Any], ...]:
+    # One normalizer per key field, following the rule's "normalizers" column
+    configured = configured or {}
+    return tuple(field_normalizer(f, configured.get(f)) for f in composite_key)
+
+
+def validate_normalizers(
+    configured: Mapping[str, str], composite_key: Sequence[str]
+) -> None:
+    for field, name in configured.items():
+        if field not in composite_key:
+            raise ValueError(
+                f"normalizers configured for a field not in the key: {field}"
+            )
+        normalizer = REGISTRY.get(name)
+        if normalizer is None:
+            allowed = ", ".join(sorted(REGISTRY))
+            raise ValueError(f"Unknown normalizer '{name}'; must be one of: {allowed}")
+        kind = FIELD_KINDS.get(field, TEXT)
+        if normalizer.kind != kind:
+            raise ValueError(
+                f"Normalizer '{name}' does not produce {kind} values for {field}"
+            )
+
+
+_UNSEEN: Any = object()
+
+
+def normalize_many(func: Callable[[Any], Any], values: Iterable[Any]) -> list[Any]:
+    # Batch API: each distinct value is normalized once per call; values that
+    # fail come back as None
+    seen: dict[tuple[type, Any], Any] = {}
+    out = []
+    for value in values:
+        key: tuple[type, Any] | None = (type(value), value)
+        try:
+            result = seen.get(key, _UNSEEN)  # type: ignore[arg-type]
+        except TypeError:
+            key, result = None, _UNSEEN
+        if result is _UNSEEN:
+            try:
+                result = func(value)
+            except NORMALIZE_ERRORS:
+                result = None
+            if key is not None:
+                seen[key] = result
+        out.append(result)
+    return out
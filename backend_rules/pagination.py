@@ -0,0 +1,30 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+# Cursors are opaque to clients: base64url(JSON) with the sort column, the
+# direction and the (sort value, id) of the last row already returned.
+
+
+def encode_cursor(order_by: str, order: str, value: Any, last_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps({"k": order_by, "o": order, "v": value, "id": last_id})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str, order: str) -> tuple[Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value, last_id = data["v"], int(data["id"])
+        if data["k"] != order_by or data["o"] != order:
+            raise ValueError("cursor was issued for a different ordering")
+        if order_by in ("created_at", "updated_at"):
+            value = datetime.fromisoformat(value)
+        elif order_by == "id":
+            value = int(value)
+    except (ValueError, TypeError, KeyError, json.JSONDecodeError) as exc:
+        raise ValueError(f"Invalid cursor: {exc}") from exc
+    return value, last_id
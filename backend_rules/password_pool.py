@@ -0,0 +1,79 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable
+
+from fastapi import HTTPException
+
+from metrics import bcrypt_seconds
+from security import hash_password, verify_password
+from settings import DEFAULT_SETTINGS
+
+
+def _timed(op: str, fn: Callable[..., Any], *args: Any) -> Any:
+    with bcrypt_seconds.time(op):
+        return fn(*args)
+
+
+class PasswordPool:
+    # bcrypt releases the GIL, so a small thread pool keeps hashing off the
+    # event loop. max_pending caps running + queued jobs; beyond it login
+    # attempts fail fast instead of piling up behind the CPU.
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        # Started on first use, so importing this module spawns no threads
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending = 0
+        self._lock = Lock()
+
+    def configure(self, workers: int, max_pending: int) -> None:
+        self.shutdown()
+        with self._lock:
+            self.workers = workers
+            self.max_pending = max_pending
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="bcrypt"
+                )
+            return self._executor
+
+    async def _run(self, op: str, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Authentication service busy, try again",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), _timed, op, fn, *args
+            )
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, secret: str) -> str:
+        return await self._run("hash", hash_password, secret)
+
+    async def verify(self, secret: str, hashed: str) -> bool:
+        return await self._run("verify", verify_password, secret, hashed)
+
+
+# Tuned by create_app from the app's settings
+password_pool = PasswordPool(
+    workers=DEFAULT_SETTINGS.bcrypt_workers,
+    max_pending=DEFAULT_SETTINGS.bcrypt_max_pending,
+)
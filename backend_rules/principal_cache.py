@@ -0,0 +1,91 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+
+from models import User
+from settings import DEFAULT_SETTINGS
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    # Detached copy of the authenticated user; safe to share across requests
+    id: int
+    username: str
+    email: str
+    admin: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,  # type: ignore
+            username=user.username,  # type: ignore
+            email=user.email,  # type: ignore
+            admin=bool(user.admin),
+        )
+
+
+class PrincipalCache:
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        # token -> (expires_at, principal, jti); the jti lets callers check
+        # revocation without decoding the token again
+        self._entries: OrderedDict[str, tuple[float, Principal, str | None]] = (
+            OrderedDict()
+        )
+        self._lock = Lock()
+
+    def get(self, token: str) -> tuple[Principal, str | None] | None:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        expires_at, principal, jti = entry
+        with self._lock:
+            if expires_at <= time.time():
+                self._entries.pop(token, None)
+                return None
+            if token in self._entries:
+                self._entries.move_to_end(token)
+        return principal, jti
+
+    def put(
+        self,
+        token: str,
+        principal: Principal,
+        token_exp: float | None,
+        jti: str | None = None,
+    ) -> None:
+        if self.max_size <= 0:
+            return
+        # Never outlive the token itself
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        with self._lock:
+            self._entries[token] = (expires_at, principal, jti)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_email(self, email: str) -> None:
+        email = email.strip().lower()
+        with self._lock:
+            stale = [
+                token
+                for token, (_, principal, _) in self._entries.items()
+                if principal.email.lower() == email
+            ]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Tuned by create_app from the app's settings
+principal_cache = PrincipalCache(
+    max_size=DEFAULT_SETTINGS.principal_cache_size,
+    ttl=DEFAULT_SETTINGS.principal_cache_ttl_seconds,
+)
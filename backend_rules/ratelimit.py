@@ -0,0 +1,200 @@
+import math
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import new_session
+from metrics import login_throttled
+from models import RateLimitBucket
+from settings import DEFAULT_SETTINGS, Settings
+
+
+class MemoryBuckets:
+    # Token buckets of this worker: key -> (tokens, updated_at). Bounded; the
+    # least recently used key is evicted, which only resets it to a full bucket.
+    def __init__(self, capacity: float, per_second: float, max_keys: int):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def take(self, key: str) -> float:
+        # 0 when a token was taken, otherwise seconds until one is available
+        now = time.time()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated_at) * self.per_second)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / self.per_second
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class DbBuckets:
+    # Same buckets shared by all workers through rate_limit_buckets. Each take
+    # runs in its own short transaction, apart from the request's session.
+    # On SQLite and Postgres refill and take are one conditional upsert, so
+    # concurrent workers never hand out the same token.
+    PURGE_EVERY = 1000
+
+    def __init__(self, capacity: float, per_second: float):
+        self.capacity = capacity
+        self.per_second = per_second
+        self._calls = 0
+
+    def _refilled(self, tokens: float, updated_at: float, now: float) -> float:
+        return min(self.capacity, tokens + (now - updated_at) * self.per_second)
+
+    async def take(self, key: str) -> float:
+        now = time.time()
+        async with new_session() as session:
+            self._calls += 1
+            if self._calls % self.PURGE_EVERY == 0:
+                # Buckets idle long enough to be full again carry no state
+                idle = self.capacity / self.per_second
+                await session.execute(
+                    delete(RateLimitBucket).where(
+                        RateLimitBucket.updated_at < now - idle
+                    )
+                )
+            dialect = session.bind.dialect.name
+            if dialect in ("postgresql", "sqlite"):
+                tokens = await self._take_upsert(session, dialect, key, now)
+            else:
+                tokens = await self._take_portable(session, key, now)
+            await session.commit()
+        return max((1 - tokens) / self.per_second, 0.0)
+
+    async def _take_upsert(
+        self, session: AsyncSession, dialect: str, key: str, now: float
+    ) -> float:
+        # Tokens left before the take: >= 1 when one was taken
+        if dialect == "postgresql":
+            insert, least = postgresql.insert, func.least
+        else:
+            insert, least = sqlite.insert, func.min
+        table = RateLimitBucket.__table__
+        refilled = least(
+            self.capacity,
+            table.c.tokens + (now - table.c.updated_at) * self.per_second,
+        )
+        stmt = insert(table).values(key=key, tokens=self.capacity - 1, updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={"tokens": refilled - 1, "updated_at": now},
+            where=refilled >= 1,
+        ).returning(table.c.tokens)
+        taken = await session.scalar(stmt)
+        if taken is not None:
+            return taken + 1
+        tokens, updated_at = (
+            await session.execute(
+                select(RateLimitBucket.tokens, RateLimitBucket.updated_at).where(
+                    RateLimitBucket.key == key
+                )
+            )
+        ).one()
+        return self._refilled(tokens, updated_at, now)
+
+    async def _take_portable(
+        self, session: AsyncSession, key: str, now: float
+    ) -> float:
+        # Dialects without ON CONFLICT: row lock, then read-modify-write. A
+        # concurrent first insert of the key makes ours fail; read it instead.
+        while True:
+            bucket = await session.get(RateLimitBucket, key, with_for_update=True)
+            if bucket is not None:
+                break
+            try:
+                async with session.begin_nested():
+                    session.add(
+                        RateLimitBucket(
+                            key=key, tokens=self.capacity - 1, updated_at=now
+                        )
+                    )
+                return self.capacity
+            except IntegrityError:
+                continue
+        tokens = self._refilled(bucket.tokens, bucket.updated_at, now)
+        if tokens >= 1:
+            bucket.tokens, bucket.updated_at = tokens - 1, now
+        return tokens
+
+    def clear(self) -> None:
+        self._calls = 0
+
+
+Buckets = MemoryBuckets | DbBuckets
+
+
+class LoginRateLimiter:
+    # Per-email and per-client-IP buckets, checked before any user lookup or
+    # bcrypt work. Every attempt costs a token, successful or not.
+    def __init__(self, settings: Settings):
+        self.configure(settings)
+
+    def configure(self, settings: Settings) -> None:
+        self.enabled = settings.login_rate_limit_enabled
+        self.by_email = self._buckets(
+            settings, settings.login_email_burst, settings.login_email_per_minute
+        )
+        self.by_ip = self._buckets(
+            settings, settings.login_ip_burst, settings.login_ip_per_minute
+        )
+
+    @staticmethod
+    def _buckets(settings: Settings, burst: int, per_minute: float) -> Buckets:
+        backend = settings.login_rate_limit_backend
+        if backend == "memory":
+            return MemoryBuckets(
+                burst, per_minute / 60, settings.login_rate_limit_max_keys
+            )
+        if backend == "db":
+            return DbBuckets(burst, per_minute / 60)
+        raise ValueError(f"Unknown login_rate_limit_backend: {backend}")
+
+    async def check(self, email: str, client_ip: str | None) -> None:
+        if not self.enabled:
+            return
+        checks = [("email", self.by_email, "email:" + email.strip().lower())]
+        if client_ip:
+            # IP first: a flood from one client does not drain its victims'
+            # per-email buckets
+            checks.insert(0, ("ip", self.by_ip, "ip:" + client_ip))
+        for scope, buckets, key in checks:
+            wait = await buckets.take(key)
+            if wait > 0:
+                login_throttled.inc(scope)
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many login attempts, try again later",
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+
+    def clear(self) -> None:
+        self.by_email.clear()
+        self.by_ip.clear()
+
+
+# Reconfigured by create_app from the app's settings
+login_rate_limiter = LoginRateLimiter(DEFAULT_SETTINGS)
@@ -0,0 +1,468 @@
+"""Reconcile RC and payment exports against the rules, one gateway per task.
+
+Run from backend_rules/:
+
+    python reconcile.py --rcs rcs.jsonl --payments payments.csv --output out.jsonl
+    python reconcile.py --rcs a.jsonl b.jsonl --payments p.jsonl --workers 8
+
+Inputs are JSONL, or CSV when the file name ends in .csv (dotted headers such
+as payment_information.reference_1 become nested objects). Records are
+spilled to per-gateway files, each gateway is matched in a worker process
+and results are appended to the output as JSON lines while shards finish.
+A summary is printed as JSON.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from multiprocessing import get_context
+from pathlib import Path
+from typing import IO, Iterable, Iterator
+
+from sqlalchemy import select
+
+from columnar import ColumnBatch, StringDictionary, match_columns
+from database import dispose_engine, new_session
+from extractors import MISSING, CompiledRule, compile_path, get_compiled
+from fingerprints import fingerprint
+from matching import Tolerance, normalized_keys, payment_extractor
+from models import Rule
+from settings import Settings, use_settings
+
+RC = "rc"
+PAYMENT = "payment"
+
+# Gateways per IN query when loading rules
+RULE_CHUNK_SIZE = 5000
+# Lines parsed at a time while sub-partitioning an oversized shard
+SPLIT_CHUNK_SIZE = 10000
+MAX_SUB_SHARDS = 256
+
+
+@dataclass(frozen=True, slots=True)
+class RuleSpec:
+    # Plain copy of a Rule row; what matching needs, picklable for the workers
+    gateway_id: int
+    version: int
+    composite_key: list
+    field_paths: dict
+    tolerance: dict | None
+    normalizers: dict | None
+
+
+@dataclass(frozen=True, slots=True)
+class ShardTask:
+    gateway_id: int
+    rule: RuleSpec | None
+    rc_path: Path
+    rc_count: int
+    payment_path: Path
+    payment_count: int
+    output_path: Path
+    max_records: int
+    payment_paths: dict | None
+
+
+def _unflatten(row: dict[str, str]) -> dict:
+    doc: dict = {}
+    for column, value in row.items():
+        if column is None:
+            continue
+        *parents, leaf = column.split(".")
+        target = doc
+        for key in parents:
+            target = target.setdefault(key, {})
+        target[leaf] = value
+    return doc
+
+
+def read_records(
+    path: Path,
+) -> Iterator[tuple[int, dict | None, str | None, str | None]]:
+    # (line number, record, raw JSON line when the input already is one,
+    # error); lines that are not valid JSON come back with record None
+    with open(path, newline="" if path.suffix == ".csv" else None) as f:
+        if path.suffix == ".csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, _unflatten(row), None, None
+            return
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_no, None, None, f"Invalid JSON: {exc}"
+                continue
+            yield line_no, record, line, None
+
+
+class Partitioner:
+    # Buffers raw JSON lines per gateway and appends them to the gateway's
+    # spill file once `limit` lines are buffered in total.
+    def __init__(self, root: Path, side: str, limit: int):
+        self.root = root
+        self.side = side
+        self.limit = limit
+        self.counts: dict[int, int] = {}
+        self._buffers: dict[int, list[str]] = {}
+        self._buffered = 0
+
+    def path(self, gateway_id: int) -> Path:
+        return self.root / f"{self.side}-{gateway_id}.jsonl"
+
+    def add(self, gateway_id: int, line: str) -> None:
+        self._buffers.setdefault(gateway_id, []).append(line)
+        self.counts[gateway_id] = self.counts.get(gateway_id, 0) + 1
+        self._buffered += 1
+        if self._buffered >= self.limit:
+            self.flush()
+
+    def flush(self) -> None:
+        for gateway_id, lines in self._buffers.items():
+            with open(self.path(gateway_id), "a") as f:
+                f.writelines(lines)
+        self._buffers.clear()
+        self._buffered = 0
+
+
+def _dump(record: dict) -> str:
+    return (
+        json.dumps(record, ensure_ascii=False, default=str, separators=(",", ":"))
+        + "\n"
+    )
+
+
+def partition(
+    paths: Iterable[Path],
+    partitioner: Partitioner,
+    gateway_field: str,
+    out: IO[str],
+    counts: dict[str, int],
+) -> None:
+    get_gateway = compile_path(gateway_field)
+    side = partitioner.side
+    for path in paths:
+        for line_no, record, line, error in read_records(path):
+            if error is not None:
+                out.write(
+                    _dump(
+                        {
+                            "status": "error",
+                            "side": side,
+                            "path": str(path),
+                            "line": line_no,
+                            "error": error,
+                        }
+                    )
+                )
+                counts["error"] = counts.get("error", 0) + 1
+                continue
+            gateway_id = get_gateway(record)
+            try:
+                if gateway_id is MISSING:
+                    raise ValueError
+                gateway_id = int(gateway_id)
+            except (TypeError, ValueError):
+                out.write(_dump({"status": "no_gateway", side: record}))
+                counts["no_gateway"] = counts.get("no_gateway", 0) + 1
+                continue
+            if line is None or not line.endswith("\n"):
+                line = _dump(record)
+            partitioner.add(gateway_id, line)
+    partitioner.flush()
+
+
+async def load_rules(gateway_ids: Iterable[int]) -> dict[int, RuleSpec]:
+    ids = sorted(gateway_ids)
+    rules: dict[int, RuleSpec] = {}
+    try:
+        async with new_session() as session:
+            for start in range(0, len(ids), RULE_CHUNK_SIZE):
+                rows = await session.scalars(
+                    select(Rule).where(
+                        Rule.enabled.is_(True),
+                        Rule.gateway_id.in_(ids[start : start + RULE_CHUNK_SIZE]),
+                    )
+                )
+                for rule in rows:
+                    rules[rule.gateway_id] = RuleSpec(
+                        rule.gateway_id,
+                        rule.version or 0,
+                        list(rule.composite_key),
+                        dict(rule.field_paths),
+                        rule.tolerance,
+                        rule.normalizers,
+                    )
+    finally:
+        await dispose_engine()
+    return rules
+
+
+# Worker side
+
+
+def _read_lines(path: Path) -> Iterator[list[str]]:
+    if not path.exists():
+        return
+    with open(path) as f:
+        chunk: list[str] = []
+        for line in f:
+            chunk.append(line)
+            if len(chunk) >= SPLIT_CHUNK_SIZE:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def _partition_positions(rule: RuleSpec) -> tuple[int, ...]:
+    # Key positions that must be equal for two records to match: the whole
+    # key for exact rules, everything but amount/date when tolerances apply.
+    size = len(rule.composite_key)
+    if Tolerance.from_rule(rule.tolerance).is_exact:
+        return tuple(range(size))
+    return tuple(
+        i for i, f in enumerate(rule.composite_key) if f not in ("amount", "date")
+    )
+
+
+def _split(
+    task: ShardTask, positions: tuple[int, ...], buckets: int, root: Path
+) -> list[tuple[Path, Path]]:
+    # Records whose partition key hashes to the same bucket land in the same
+    # sub-shard, so matching each sub-shard alone gives the same result.
+    parts = [
+        (root / f"{RC}-{b}.jsonl", root / f"{PAYMENT}-{b}.jsonl")
+        for b in range(buckets)
+    ]
+    sides = (
+        (0, task.rc_path, get_compiled(task.rule)),
+        (1, task.payment_path, payment_extractor(task.rule, task.payment_paths)),
+    )
+    for side, path, compiled in sides:
+        files = [open(p[side], "w") for p in parts]
+        try:
+            n = 0
+            for chunk in _read_lines(path):
+                keys = normalized_keys(compiled, [json.loads(line) for line in chunk])
+                for line, key in zip(chunk, keys):
+                    if key is None:
+                        # Unmatchable anyway; spread evenly
+                        bucket = n % buckets
+                    else:
+                        bucket = fingerprint([key[i] for i in positions]) % buckets
+                    files[bucket].write(line)
+                    n += 1
+        finally:
+            for f in files:
+                f.close()
+    return parts
+
+
+def _load_columns(
+    compiled: CompiledRule, path: Path, dictionary: StringDictionary
+) -> tuple[list[str], ColumnBatch]:
+    # Spilled lines are kept as text and copied into the results; the parsed
+    # documents only live long enough to fill the key columns.
+    lines: list[str] = []
+    batch = ColumnBatch(compiled.composite_key, dictionary)
+    for chunk in _read_lines(path):
+        lines.extend(line.rstrip() for line in chunk)
+        batch.extend(compiled, (json.loads(line) for line in chunk))
+    return lines, batch
+
+
+def _match_files(
+    task: ShardTask, rc_path: Path, payment_path: Path, out: IO[str], counts: dict
+) -> None:
+    dictionary = StringDictionary()
+    rc_lines, rcs = _load_columns(get_compiled(task.rule), rc_path, dictionary)
+    pay_lines, payments = _load_columns(
+        payment_extractor(task.rule, task.payment_paths), payment_path, dictionary
+    )
+    result = match_columns(task.rule, rcs, payments)
+
+    prefix = f'{{"gateway_id":{task.gateway_id},"status":'
+    for i, j in result.matched:
+        out.write(f'{prefix}"matched","rc":{rc_lines[i]},"payment":{pay_lines[j]}}}\n')
+    for i in result.unmatched_rcs:
+        out.write(f'{prefix}"unmatched_rc","rc":{rc_lines[i]}}}\n')
+    for j in result.unmatched_payments:
+        out.write(f'{prefix}"unmatched_payment","payment":{pay_lines[j]}}}\n')
+    for rc_rows, pay_rows in result.ambiguous:
+        rc_docs = ",".join(rc_lines[i] for i in rc_rows)
+        pay_docs = ",".join(pay_lines[j] for j in pay_rows)
+        out.write(f'{prefix}"ambiguous","rcs":[{rc_docs}],"payments":[{pay_docs}]}}\n')
+    for status, size in (
+        ("matched", len(result.matched)),
+        ("unmatched_rc", len(result.unmatched_rcs)),
+        ("unmatched_payment", len(result.unmatched_payments)),
+        ("ambiguous", len(result.ambiguous)),
+    ):
+        counts[status] = counts.get(status, 0) + size
+
+
+def run_shard(task: ShardTask) -> dict[str, int]:
+    counts: dict[str, int] = {}
+    with open(task.output_path, "w") as out:
+        if task.rule is None:
+            prefix = f'{{"gateway_id":{task.gateway_id},"status":"no_rule",'
+            for side, path in ((RC, task.rc_path), (PAYMENT, task.payment_path)):
+                for chunk in _read_lines(path):
+                    for line in chunk:
+                        out.write(f'{prefix}"{side}":{line.rstrip()}}}\n')
+                    counts["no_rule"] = counts.get("no_rule", 0) + len(chunk)
+            return counts
+
+        total = task.rc_count + task.payment_count
+        positions = _partition_positions(task.rule)
+        if total <= task.max_records or not positions:
+            # Fits, or cannot be split (key is only amount/date with tolerance)
+            _match_files(task, task.rc_path, task.payment_path, out, counts)
+            return counts
+
+        buckets = min(math.ceil(total / task.max_records), MAX_SUB_SHARDS)
+        root = task.output_path.with_suffix(".parts")
+        root.mkdir()
+        try:
+            for rc_path, payment_path in _split(task, positions, buckets, root):
+                _match_files(task, rc_path, payment_path, out, counts)
+                rc_path.unlink()
+                payment_path.unlink()
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+        counts["sub_shards"] = buckets
+    return counts
+
+
+# Driver
+
+
+def _add(totals: dict[str, int], counts: dict[str, int]) -> None:
+    for status, n in counts.items():
+        totals[status] = totals.get(status, 0) + n
+
+
+def reconcile(args: argparse.Namespace) -> dict:
+    started = time.perf_counter()
+    totals: dict[str, int] = {}
+    failed: dict[int, str] = {}
+
+    with (
+        tempfile.TemporaryDirectory(prefix="reconcile-", dir=args.spill_dir) as tmp,
+        open(args.output, "w") as out,
+    ):
+        root = Path(tmp)
+        rcs = Partitioner(root, RC, args.buffer_records)
+        payments = Partitioner(root, PAYMENT, args.buffer_records)
+        partition(args.rcs, rcs, args.gateway_field, out, totals)
+        partition(args.payments, payments, args.gateway_field, out, totals)
+        partitioned = time.perf_counter()
+
+        gateway_ids = rcs.counts.keys() | payments.counts.keys()
+        rules = asyncio.run(load_rules(gateway_ids))
+
+        tasks = [
+            ShardTask(
+                gateway_id,
+                rules.get(gateway_id),
+                rcs.path(gateway_id),
+                rcs.counts.get(gateway_id, 0),
+                payments.path(gateway_id),
+                payments.counts.get(gateway_id, 0),
+                root / f"result-{gateway_id}.jsonl",
+                args.max_shard_records,
+                args.payment_paths,
+            )
+            for gateway_id in gateway_ids
+        ]
+        # Largest shards first so the slowest one does not start last
+        tasks.sort(key=lambda t: t.rc_count + t.payment_count, reverse=True)
+
+        # spawn: workers import only the matching code; no inherited engine,
+        # connections or threads
+        with ProcessPoolExecutor(args.workers, mp_context=get_context("spawn")) as pool:
+            futures = {pool.submit(run_shard, task): task for task in tasks}
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    _add(totals, future.result())
+                except Exception as exc:
+                    failed[task.gateway_id] = f"{type(exc).__name__}: {exc}"
+                    continue
+                finally:
+                    task.rc_path.unlink(missing_ok=True)
+                    task.payment_path.unlink(missing_ok=True)
+                with open(task.output_path) as result:
+                    shutil.copyfileobj(result, out)
+                task.output_path.unlink()
+
+    finished = time.perf_counter()
+    return {
+        "gateways": len(tasks),
+        "gateways_without_rule": len(tasks) - len(rules),
+        "records": {
+            RC: sum(rcs.counts.values()),
+            PAYMENT: sum(payments.counts.values()),
+        },
+        "results": totals,
+        "failed": failed,
+        "workers": args.workers,
+        "partition_seconds": round(partitioned - started, 3),
+        "seconds": round(finished - started, 3),
+    }
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rcs", type=Path, nargs="+", required=True)
+    parser.add_argument("--payments", type=Path, nargs="+", required=True)
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--gateway-field", default="gateway_id", help="dotted path in every record"
+    )
+    parser.add_argument(
+        "--payment-paths",
+        type=json.loads,
+        help='JSON mapping of key fields to payment paths, e.g. {"amount": "valor"}',
+    )
+    parser.add_argument(
+        "--max-shard-records",
+        type=int,
+        default=200_000,
+        help="RCs + payments a worker loads at once; larger shards are split",
+    )
+    parser.add_argument(
+        "--buffer-records",
+        type=int,
+        default=100_000,
+        help="lines buffered per side while partitioning",
+    )
+    parser.add_argument("--spill-dir", help="where shard files go (default: TMPDIR)")
+    parser.add_argument("--database-url", help="overrides DATABASE_URL")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.database_url:
+        use_settings(Settings.from_env(database_url=args.database_url))
+    summary = reconcile(args)
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+from typing import Any
+
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+
+# Reused serializers for payloads that are not a single pydantic model
+_adapters: dict[Any, TypeAdapter] = {}
+
+
+def _adapter(type_: Any) -> TypeAdapter:
+    adapter = _adapters.get(type_)
+    if adapter is None:
+        adapter = _adapters[type_] = TypeAdapter(type_)
+    return adapter
+
+
+class ModelResponse(Response):
+    # Serializes with the model's compiled pydantic-core serializer straight to
+    # bytes, skipping jsonable_encoder. Routes still declare response_model so
+    # the OpenAPI schema is unchanged.
+    media_type = "application/json"
+
+    def __init__(self, content: Any, type_: Any = None, **kwargs) -> None:
+        self.type_ = type_
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if self.type_ is None and isinstance(content, BaseModel):
+            return type(content).__pydantic_serializer__.to_json(content)
+        return _adapter(self.type_ or type(content)).dump_json(content)
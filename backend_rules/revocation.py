@@ -0,0 +1,120 @@
+import time
+from datetime import datetime, timedelta
+from threading import Lock
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import RevokedToken, utcnow
+from settings import DEFAULT_SETTINGS
+
+
+class RevocationList:
+    # jti -> exp of every revoked token that has not expired yet. Requests
+    # check it in memory; revoked_tokens shares revocations between workers,
+    # which pull recently revoked rows every check_interval.
+    def __init__(self, check_interval: float, overlap: float):
+        # check_interval < 0 loads once and then trusts local revocations only
+        self.check_interval = check_interval
+        self.overlap = overlap
+        self._revoked: dict[str, int] = {}
+        self._synced_at: datetime | None = None
+        self._checked_at: float | None = None
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def is_revoked(self, jti: str | None) -> bool:
+        return jti is not None and jti in self._revoked
+
+    def _add(self, jti: str, expires_at: int) -> None:
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def _prune(self) -> None:
+        now = time.time()
+        with self._lock:
+            expired = [jti for jti, exp in self._revoked.items() if exp <= now]
+            for jti in expired:
+                del self._revoked[jti]
+
+    async def sync(self, session: AsyncSession) -> None:
+        now = time.monotonic()
+        if self._checked_at is not None and (
+            self.check_interval < 0 or now - self._checked_at < self.check_interval
+        ):
+            return
+        # Set first: concurrent requests keep using the current set meanwhile
+        self._checked_at = now
+        # Not "id > last id seen": ids are assigned at insert but become
+        # visible at commit, possibly out of order. revoked_at is stamped
+        # before the commit too, so each read goes back `overlap` seconds
+        # before the previous one started; the dict dedupes what is re-read.
+        started = utcnow()
+        query = select(RevokedToken.jti, RevokedToken.expires_at).where(
+            RevokedToken.expires_at > int(time.time())
+        )
+        if self._synced_at is not None:
+            since = self._synced_at - timedelta(seconds=self.overlap)
+            query = query.where(RevokedToken.revoked_at >= since)
+        rows = await session.execute(query)
+        with self._lock:
+            for jti, expires_at in rows:
+                self._revoked[jti] = expires_at
+        self._synced_at = started
+        self._prune()
+
+    async def revoke(self, session: AsyncSession, jti: str, expires_at: int) -> bool:
+        # Runs in the caller's transaction; commit to share it with the other
+        # workers. False when the token was already revoked, which makes
+        # refresh-token rotation safe against concurrent reuse.
+        await session.execute(
+            delete(RevokedToken).where(RevokedToken.expires_at <= int(time.time()))
+        )
+        dialect = session.bind.dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            dialect_insert = (
+                postgresql.insert if dialect == "postgresql" else sqlite.insert
+            )
+            inserted = await session.scalar(
+                dialect_insert(RevokedToken)
+                .values(jti=jti, expires_at=expires_at)
+                .on_conflict_do_nothing()
+                .returning(RevokedToken.id)
+            )
+            revoked = inserted is not None
+        else:
+            revoked = await self._insert_portable(session, jti, expires_at)
+        self._add(jti, expires_at)
+        return revoked
+
+    @staticmethod
+    async def _insert_portable(
+        session: AsyncSession, jti: str, expires_at: int
+    ) -> bool:
+        # Dialects without ON CONFLICT: look up, then insert in a savepoint;
+        # the unique jti still settles a race with a concurrent revoke
+        if await session.scalar(select(RevokedToken.id).where(RevokedToken.jti == jti)):
+            return False
+        try:
+            async with session.begin_nested():
+                session.add(RevokedToken(jti=jti, expires_at=expires_at))
+            return True
+        except IntegrityError:
+            return False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._revoked.clear()
+            self._synced_at = None
+            self._checked_at = None
+
+
+# Tuned by create_app from the app's settings
+revocation_list = RevocationList(
+    check_interval=DEFAULT_SETTINGS.revocation_check_seconds,
+    overlap=DEFAULT_SETTINGS.revocation_overlap_seconds,
+)
@@ -0,0 +1,129 @@
+import time
+from threading import Lock
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Rule, RulesVersion
+from schema import RuleOut
+from settings import DEFAULT_SETTINGS
+
+
+async def current_version(session: AsyncSession) -> int:
+    version = await session.scalar(
+        select(RulesVersion.version).where(RulesVersion.id == 1)
+    )
+    return version or 0
+
+
+async def bump_version(session: AsyncSession, count: int = 1) -> int:
+    # Runs inside the caller's transaction, so the new version is committed or
+    # rolled back together with the rule change. Returns the last new version.
+    result = await session.execute(
+        update(RulesVersion)
+        .where(RulesVersion.id == 1)
+        .values(version=RulesVersion.version + count)
+    )
+    if result.rowcount == 0:  # type: ignore
+        session.add(RulesVersion(id=1, version=count))
+        await session.flush()
+        return count
+    return await current_version(session)
+
+
+class RuleCache:
+    def __init__(self, check_interval: float):
+        # check_interval < 0 trusts local writes only (single worker)
+        self.check_interval = check_interval
+        self.version: int | None = None
+        self._entries: dict[int, RuleOut | None] = {}
+        self._checked_at = 0.0
+        self._lock = Lock()
+
+    async def _revalidate(self, session: AsyncSession) -> None:
+        now = time.monotonic()
+        if self.version is not None and (
+            self.check_interval < 0 or now - self._checked_at < self.check_interval
+        ):
+            return
+        version = await current_version(session)
+        with self._lock:
+            # Versions only grow; an older read raced with a local write
+            if self.version is None or version > self.version:
+                self._entries.clear()
+                self.version = version
+            self._checked_at = now
+
+    async def get(self, session: AsyncSession, gateway_id: int) -> RuleOut | None:
+        await self._revalidate(session)
+        try:
+            return self._entries[gateway_id]
+        except KeyError:
+            pass
+
+        loaded_at = self.version
+        rule = await session.scalar(select(Rule).where(Rule.gateway_id == gateway_id))
+        snapshot = RuleOut.model_validate(rule) if rule else None
+        with self._lock:
+            # Misses are cached too; skip if a write landed while loading
+            if self.version == loaded_at:
+                self._entries[gateway_id] = snapshot
+        return snapshot
+
+    async def get_many(
+        self, session: AsyncSession, gateway_ids: list[int]
+    ) -> dict[int, RuleOut | None]:
+        await self._revalidate(session)
+        found: dict[int, RuleOut | None] = {}
+        pending = []
+        for gateway_id in dict.fromkeys(gateway_ids):
+            try:
+                found[gateway_id] = self._entries[gateway_id]
+            except KeyError:
+                pending.append(gateway_id)
+        if not pending:
+            return found
+
+        # Everything not cached comes from a single IN query
+        loaded_at = self.version
+        rules = await session.scalars(select(Rule).where(Rule.gateway_id.in_(pending)))
+        loaded = {rule.gateway_id: RuleOut.model_validate(rule) for rule in rules}
+        with self._lock:
+            for gateway_id in pending:
+                snapshot = loaded.get(gateway_id)  # type: ignore
+                if self.version == loaded_at:
+                    self._entries[gateway_id] = snapshot
+                found[gateway_id] = snapshot
+        return found
+
+    async def warm_up(self, session: AsyncSession) -> list[RuleOut]:
+        # Loads every enabled rule in one query; disabled ones and misses are
+        # still cached on first lookup. Returns the rules loaded.
+        version = await current_version(session)
+        rules = (await session.scalars(select(Rule).where(Rule.enabled))).all()
+        snapshots = [RuleOut.model_validate(rule) for rule in rules]
+        with self._lock:
+            if self.version is not None and version < self.version:
+                return []
+            self._entries = {s.gateway_id: s for s in snapshots}
+            self.version = version
+            self._checked_at = time.monotonic()
+        return snapshots
+
+    def apply(self, version: int, gateway_id: int, snapshot: RuleOut | None) -> None:
+        # Called after a local write commits. If versions were skipped, another
+        # worker wrote in between and every other entry may be stale.
+        with self._lock:
+            if self.version is None or version != self.version + 1:
+                self._entries.clear()
+            self._entries[gateway_id] = snapshot
+            self.version = version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.version = None
+
+
+# Tuned by create_app from the app's settings
+rule_cache = RuleCache(check_interval=DEFAULT_SETTINGS.rule_cache_check_seconds)
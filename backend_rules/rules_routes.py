@@ -1,28 +1,77 @@
-from typing import Annotated
+import json
+from datetime import datetime
+from typing import (
+    Annotated,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+)
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func, or_
-from sqlalchemy.orm import Session  # noqa: F401
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
+import extractors
+from change_feed import change_notifier, record_change, record_changes
+from database import new_session
 from dependecy import create_session, token_verify
-from models import Rule, User  # noqa: F401
-from schema import RuleOut, RuleSchema, RulesFilter, RulesPageSchema, UserSchema
+from extractors import CompiledRule
+from matching import explain_failure, normalized_keys
+from models import Rule, User, utcnow  # noqa: F401
+from pagination import decode_cursor, encode_cursor
+from responses import ModelResponse
+from rule_cache import bump_version, rule_cache
+from schema import (
+    MAX_BATCH_GATEWAYS,
+    BulkImportResult,
+    BulkRowResult,
+    MessageOut,
+    RuleChangesSchema,
+    RuleMutationOut,
+    RuleOut,
+    RulesBatchRequest,
+    RulesBatchSchema,
+    RuleSchema,
+    RulesFilter,
+    RulesPageSchema,
+    UserSchema,
+)
+from search import apply_search
+from settings import get_settings
+from streaming import (
+    DuplexStreamingResponse,
+    coalesce,
+    gzip_stream,
+    iter_json_records,
+    iter_line_batches,
+)
 
 rules_router = APIRouter(prefix="/rules", tags=["rules"])
 
+BULK_BATCH_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
 
-@rules_router.post("/insert-rule")
+# Static payload, serialized once
+RULE_DEFINITIONS_JSON = ModelResponse(RuleSchema.RULE_NAME_DEFINITIONS).body
+
+
+@rules_router.post("/insert-rule", response_model=RuleMutationOut)
 async def insert_rule(
     rule_schema: RuleSchema,
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
     current_user: UserSchema = Depends(token_verify),
 ):
     if not current_user.admin:
         raise HTTPException(
             status_code=403, detail="User not authorized to insert rules"
         )
-    gateway_id = (
-        session.query(Rule).filter(Rule.gateway_id == rule_schema.gateway_id).first()  # type: ignore
+    gateway_id = await session.scalar(
+        select(Rule.id).where(Rule.gateway_id == rule_schema.gateway_id)
     )
     if gateway_id:
         raise HTTPException(
@@ -46,106 +95,495 @@ async def insert_rule(
         composite_key=rule_schema.composite_key,  # type: ignore
         field_paths=rule_schema.field_paths,
         tolerance=rule_schema.tolerance,
+        normalizers=rule_schema.normalizers,
     )
+    new_rule.version = await bump_version(session)
     session.add(new_rule)
-    session.commit()
-    return {
-        "message": "Rule inserted successfully",
-        "rule_id": new_rule.id,
-        "rule": new_rule,
-    }
+    await session.flush()
+    snapshot = RuleOut.model_validate(new_rule)
+    record_change(session, snapshot.version, snapshot.gateway_id, snapshot)
+    await session.commit()
+    rule_cache.apply(snapshot.version, snapshot.gateway_id, snapshot)
+    change_notifier.notify()
+    return ModelResponse(
+        RuleMutationOut(
+            message="Rule inserted successfully", rule_id=snapshot.id, rule=snapshot
+        )
+    )
+
+
+async def _upsert_batch(
+    session: AsyncSession,
+    batch: list[tuple[int, RuleSchema]],
+    first_version: int,
+    now: datetime,
+    results: list[BulkRowResult],
+) -> None:
+    # One IN query finds existing gateways; inserts and updates then go out
+    # as two executemany statements inside the caller's transaction.
+    gateway_ids = [rule.gateway_id for _, rule in batch]
+    existing = dict(
+        (
+            await session.execute(
+                select(Rule.gateway_id, Rule.id).where(Rule.gateway_id.in_(gateway_ids))
+            )
+        ).all()
+    )
+
+    inserts, updates = [], []
+    for offset, (index, rule) in enumerate(batch):
+        values = {
+            "gateway_name": rule.gateway_name,
+            "rule_name": rule.rule_name,
+            "enabled": rule.enabled,
+            "composite_key": rule.composite_key,
+            "field_paths": rule.field_paths,
+            "tolerance": rule.tolerance,
+            "normalizers": rule.normalizers,
+            "version": first_version + offset,
+        }
+        rule_id = existing.get(rule.gateway_id)
+        if rule_id is None:
+            inserts.append({"gateway_id": rule.gateway_id, **values})
+            status = "inserted"
+        else:
+            updates.append({"id": rule_id, "updated_at": now, **values})
+            status = "updated"
+        results.append(
+            BulkRowResult(index=index, gateway_id=rule.gateway_id, status=status)
+        )
+
+    if inserts:
+        await session.execute(insert(Rule), inserts)
+    if updates:
+        await session.execute(update(Rule), updates)
+    rules = await session.scalars(
+        select(Rule)
+        .where(Rule.gateway_id.in_(gateway_ids))
+        .execution_options(populate_existing=True)
+    )
+    await record_changes(session, rules.all())
+
+
+@rules_router.post("/bulk", response_model=BulkImportResult)
+async def bulk_import_rules(
+    request: Request,
+    session: AsyncSession = Depends(create_session),
+    current_user: UserSchema = Depends(token_verify),
+):
+    # Body: NDJSON (application/x-ndjson) or a JSON array of RuleSchema items,
+    # parsed and validated as it streams in. Valid rows are buffered and only
+    # written once the body is complete, in one short transaction, so a slow
+    # upload never holds the write lock (or the rules_version row lock).
+    if not current_user.admin:
+        raise HTTPException(
+            status_code=403, detail="User not authorized to insert rules"
+        )
+    # Ends the read transaction opened by token_verify before the upload
+    await session.commit()
+
+    results: list[BulkRowResult] = []
+    rows: list[tuple[int, RuleSchema]] = []
+    seen: set[int] = set()
+    index = -1
+    try:
+        async for item, error in iter_json_records(
+            request.headers.get("content-type"), request.stream()
+        ):
+            index += 1
+            if error is None:
+                try:
+                    rule = RuleSchema.model_validate(item)
+                except ValidationError as exc:
+                    error = "; ".join(
+                        f"{'.'.join(str(loc) for loc in e['loc']) or 'body'}: {e['msg']}"
+                        for e in exc.errors()
+                    )
+            if error is None and rule.gateway_id in seen:
+                error = f"Duplicate gateway ID in payload: {rule.gateway_id}"
+            if error is not None:
+                gateway_id = item.get("gateway_id") if isinstance(item, dict) else None
+                results.append(
+                    BulkRowResult(
+                        index=index,
+                        gateway_id=gateway_id if isinstance(gateway_id, int) else None,
+                        status="error",
+                        detail=error,
+                    )
+                )
+                continue
+            seen.add(rule.gateway_id)
+            rows.append((index, rule))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    if rows:
+        first_version = await bump_version(session, len(rows)) - len(rows) + 1
+        now = utcnow()
+        for start in range(0, len(rows), BULK_BATCH_SIZE):
+            await _upsert_batch(
+                session,
+                rows[start : start + BULK_BATCH_SIZE],
+                first_version + start,
+                now,
+                results,
+            )
+        await session.commit()
+        rule_cache.clear()
+        change_notifier.notify()
+
+    results.sort(key=lambda r: r.index)
+    counts = {"inserted": 0, "updated": 0, "error": 0}
+    for result in results:
+        counts[result.status] += 1
+    return ModelResponse(
+        BulkImportResult(
+            inserted=counts["inserted"],
+            updated=counts["updated"],
+            errors=counts["error"],
+            results=results,
+        )
+    )
+
+
+async def _export_lines(enabled: Optional[bool]) -> AsyncIterator[bytes]:
+    # Own session: the stream outlives the request handler. Rows are fetched
+    # through a server-side cursor EXPORT_BATCH_SIZE at a time.
+    query = select(Rule.__table__).order_by(Rule.id)
+    if enabled is not None:
+        query = query.where(Rule.enabled == enabled)
+    async with new_session() as session:
+        result = await session.stream(
+            query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for row in result.mappings():
+            yield RuleOut.model_validate(row).model_dump_json().encode() + b"\n"
+
+
+@rules_router.get("/export")
+async def export_rules(
+    enabled: Optional[bool] = None,
+    gzip: bool = False,
+    session: AsyncSession = Depends(create_session),
+    current_user: UserSchema = Depends(token_verify),
+):
+    if not current_user.admin:
+        raise HTTPException(status_code=403, detail="User not authorized to view rules")
+    # The stream reads through its own session; release the one token_verify
+    # used instead of holding its connection until the download ends
+    await session.close()
+
+    body = coalesce(_export_lines(enabled))
+    headers = {}
+    if gzip:
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type="application/x-ndjson", headers=headers)
 
 
-@rules_router.get("/get-rules/{gateway_id}")
+async def _evaluate_lines(
+    compiled: CompiledRule, chunks: AsyncIterable[bytes]
+) -> AsyncIterator[bytes]:
+    # Each batch of lines received is evaluated and written back before the
+    # next one is read, so memory is bounded by one network chunk.
+    line_no = 0
+    try:
+        async for lines in iter_line_batches(chunks):
+            numbers, docs, out = [], [], []
+            for line in lines:
+                line_no += 1
+                if not line.strip():
+                    continue
+                try:
+                    docs.append(json.loads(line))
+                    numbers.append(line_no)
+                except ValueError as exc:
+                    out.append({"line": line_no, "error": f"Invalid JSON: {exc}"})
+            for number, doc, key in zip(numbers, docs, normalized_keys(compiled, docs)):
+                if key is None:
+                    out.append(
+                        {"line": number, "error": explain_failure(compiled, doc)}
+                    )
+                else:
+                    out.append({"line": number, "key": key})
+            out.sort(key=lambda item: item["line"])
+            if out:
+                yield "".join(
+                    json.dumps(item, default=str, separators=(",", ":")) + "\n"
+                    for item in out
+                ).encode()
+    except ValueError as exc:
+        yield (json.dumps({"line": line_no + 1, "error": str(exc)}) + "\n").encode()
+
+
+@rules_router.post("/{gateway_id}/evaluate")
+async def evaluate_rule(
+    gateway_id: int,
+    request: Request,
+    session: AsyncSession = Depends(create_session),
+    current_user: UserSchema = Depends(token_verify),
+):
+    # NDJSON of RC documents in, NDJSON of {"line", "key"} or {"line", "error"}
+    # out, in input order. Keys follow the rule's composite_key order.
+    if not current_user.admin:
+        raise HTTPException(status_code=403, detail="User not authorized to view rules")
+    rule = await rule_cache.get(session, gateway_id)
+    if not rule:
+        raise HTTPException(
+            status_code=404, detail=f"No rule found for the Gateway ID: {gateway_id}"
+        )
+    compiled = extractors.get_compiled(rule)
+    # Evaluation only needs the compiled rule; don't pin a pooled connection
+    # for as long as the client keeps the duplex stream open
+    await session.close()
+    return DuplexStreamingResponse(
+        _evaluate_lines(compiled, request.stream()), media_type="application/x-ndjson"
+    )
+
+
+async def _lookup_batch(
+    session: AsyncSession, gateway_ids: list[int]
+) -> RulesBatchSchema:
+    rules = await rule_cache.get_many(session, gateway_ids)
+    missing = [gateway_id for gateway_id, rule in rules.items() if rule is None]
+    return RulesBatchSchema(rules=rules, missing=missing)
+
+
+@rules_router.get("/batch", response_model=RulesBatchSchema)
+async def get_rules_batch(
+    gateway_ids: Annotated[
+        list[str], Query(description="Repeated or comma-separated gateway IDs")
+    ],
+    session: AsyncSession = Depends(create_session),
+    current_user: UserSchema = Depends(token_verify),
+):
+    if not current_user.admin:
+        raise HTTPException(status_code=403, detail="User not authorized to view rules")
+    try:
+        ids = [int(part) for value in gateway_ids for part in value.split(",") if part]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="gateway_ids must be integers")
+    if not ids or len(ids) > MAX_BATCH_GATEWAYS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"gateway_ids must have between 1 and {MAX_BATCH_GATEWAYS} items",
+        )
+    return ModelResponse(await _lookup_batch(session, ids))
+
+
+@rules_router.post("/batch", response_model=RulesBatchSchema)
+async def post_rules_batch(
+    batch: RulesBatchRequest,
+    session: AsyncSession = Depends(create_session),
+    current_user: UserSchema = Depends(token_verify),
+):
+    if not current_user.admin:
+        raise HTTPException(status_code=403, detail="User not authorized to view rules")
+    return ModelResponse(await _lookup_batch(session, batch.gateway_ids))
+
+
+async def _change_events(since: int, limit: int) -> AsyncIterator[bytes]:
+    # SSE: one "change" event per row, id = version (resumable through
+    # Last-Event-ID); a comment line keeps idle connections open.
+    async for changes in change_notifier.follow(
+        since, limit, heartbeat=get_settings().change_feed_max_wait_seconds
+    ):
+        if not changes:
+            yield b": keepalive\n\n"
+            continue
+        yield b"".join(
+            b"id: %d\nevent: change\ndata: %s\n\n"
+            % (change.version, change.model_dump_json().encode())
+            for change in changes
+        )
+
+
+@rules_router.get("/changes", response_model=RuleChangesSchema)
+async def rule_changes(
+    request: Request,
+    since: int = Query(0, ge=0, description="Last version already applied"),
+    limit: int = Query(500, ge=1, le=1000),
+    wait: float = Query(0, ge=0, description="Long-poll seconds if nothing is new"),
+    session: AsyncSession = Depends(create_session),
+    current_user: UserSchema = Depends(token_verify),
+):
+    # Changes with version > since, oldest first. Accept: text/event-stream
+    # turns the request into an SSE stream that follows new changes.
+    if not current_user.admin:
+        raise HTTPException(status_code=403, detail="User not authorized to view rules")
+    # Both the poll and the stream check through short sessions of their own;
+    # waiting on the request's session would pin one connection per client
+    await session.close()
+
+    if "text/event-stream" in request.headers.get("accept", ""):
+        last_event_id = request.headers.get("last-event-id", "")
+        if last_event_id.isdigit():
+            since = int(last_event_id)
+        return StreamingResponse(
+            _change_events(since, limit),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    changes = await change_notifier.poll(
+        since, limit, min(wait, get_settings().change_feed_max_wait_seconds)
+    )
+    last_version = changes[-1].version if changes else since
+    return ModelResponse(RuleChangesSchema(changes=changes, last_version=last_version))
+
+
+@rules_router.get("/get-rules/{gateway_id}", response_model=RuleOut)
 async def get_rules(
     gateway_id: int,
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
     current_user: UserSchema = Depends(token_verify),
 ):
     if not current_user.admin:
         raise HTTPException(status_code=403, detail="User not authorized to view rules")
-    rule = session.query(Rule).filter(Rule.gateway_id == gateway_id).first()  # type: ignore
+    rule = await rule_cache.get(session, gateway_id)
     if not rule:
         raise HTTPException(
             status_code=404, detail=f"No rule found for the Gateway ID: {gateway_id}"
         )
-    return rule
+    return ModelResponse(rule)
+
+
+def _page_response(
+    total: Optional[int],
+    filters: RulesFilter,
+    items: Sequence[Rule],
+    next_cursor: Optional[str],
+) -> ModelResponse:
+    # One validation pass for the whole page instead of one call per RuleOut
+    page = RulesPageSchema.model_validate(
+        {
+            "total": total,
+            "limit": filters.limit,
+            "offset": filters.offset,
+            "items": items,
+            "next_cursor": next_cursor,
+        },
+        from_attributes=True,
+    )
+    return ModelResponse(page)
 
 
 @rules_router.get("", response_model=RulesPageSchema)
 async def list_rules(
     filters: Annotated[RulesFilter, Depends()],
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
     current_user: UserSchema = Depends(token_verify),
 ):
     if not current_user.admin:
         raise HTTPException(status_code=403, detail="User not authorized to view rules")
 
-    query = session.query(Rule)
+    query = select(Rule)
 
     if filters.gateway_id is not None:
-        query = query.filter(Rule.gateway_id == filters.gateway_id)  # type: ignore
+        query = query.where(Rule.gateway_id == filters.gateway_id)
     if filters.rule_name is not None:
-        query = query.filter(
+        query = query.where(
             func.lower(Rule.rule_name) == filters.rule_name.value.lower()
         )
     if filters.enabled is not None:
-        query = query.filter(Rule.enabled == filters.enabled)  # type: ignore
-    if filters.q:
-        like = f"%{filters.q.lower()}%"
-        query = query.filter(
-            or_(
-                func.lower(Rule.rule_name).like(like),
-                func.lower(Rule.gateway_name).like(like),
+        query = query.where(Rule.enabled == filters.enabled)
+    rank = None
+    if filters.q and filters.q.strip():
+        query, rank = apply_search(query, filters.q, session.bind.dialect.name)
+
+    total = None
+    if filters.include_total:
+        total = await session.scalar(select(func.count()).select_from(query.subquery()))
+
+    ascending = filters.order == "asc"
+    if filters.order_by == "relevance":
+        # Best FTS rank first; without a ranked search it degrades to id
+        if filters.cursor:
+            raise HTTPException(
+                status_code=400, detail="cursor is not supported with relevance"
             )
+        tie_break = Rule.id.asc() if ascending else Rule.id.desc()
+        ordering = [tie_break] if rank is None else [rank, tie_break]
+        query = query.order_by(*ordering).offset(filters.offset)
+        items = (await session.scalars(query.limit(filters.limit))).all()
+        return _page_response(total, filters, items, None)
+
+    # Keyset on (sort_col, id): id breaks ties so every row has a unique position
+    sort_col = getattr(Rule, filters.order_by)
+    sort_cols = [sort_col] if sort_col is Rule.id else [sort_col, Rule.id]
+    if filters.cursor:
+        try:
+            value, last_id = decode_cursor(
+                filters.cursor, filters.order_by, filters.order
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        position = [value] if sort_col is Rule.id else [value, last_id]
+        seek = tuple_(*sort_cols)
+        query = query.where(
+            seek > tuple_(*position) if ascending else seek < tuple_(*position)
         )
+    else:
+        query = query.offset(filters.offset)
 
-    sort_col = getattr(Rule, filters.order_by, Rule.id)
-    sort = sort_col.asc() if filters.order == "asc" else sort_col.desc()
+    query = query.order_by(
+        *[col.asc() if ascending else col.desc() for col in sort_cols]
+    )
+    items = (await session.scalars(query.limit(filters.limit + 1))).all()
 
-    total = query.count()
-    items = query.order_by(sort).offset(filters.offset).limit(filters.limit).all()
+    next_cursor = None
+    if len(items) > filters.limit:
+        items = items[: filters.limit]
+        last = items[-1]
+        next_cursor = encode_cursor(
+            filters.order_by,
+            filters.order,
+            getattr(last, filters.order_by),
+            last.id,  # type: ignore
+        )
 
-    return RulesPageSchema(
-        total=total,
-        limit=filters.limit,
-        offset=filters.offset,
-        items=[RuleOut.model_validate(r) for r in items],
-    )
+    return _page_response(total, filters, items, next_cursor)
 
 
-@rules_router.delete("/delete-rule/{gateway_id}")
+@rules_router.delete("/delete-rule/{gateway_id}", response_model=MessageOut)
 async def delete_rule(
     gateway_id: int,
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
     current_user: UserSchema = Depends(token_verify),
 ):
     if not current_user.admin:
         raise HTTPException(
             status_code=403, detail="User not authorized to delete rules"
         )
-    rule = session.query(Rule).filter(Rule.gateway_id == gateway_id).first()  # type: ignore
+    rule = await session.scalar(select(Rule).where(Rule.gateway_id == gateway_id))
     if not rule:
         raise HTTPException(
             status_code=404, detail=f"No rule found for the Gateway ID: {gateway_id}"
         )
-    session.delete(rule)
-    session.commit()
-    return {"message": f"Rule for Gateway ID {gateway_id} deleted successfully"}
+    version = await bump_version(session)
+    await session.delete(rule)
+    record_change(session, version, gateway_id, None)
+    await session.commit()
+    rule_cache.apply(version, gateway_id, None)
+    change_notifier.notify()
+    extractors.invalidate(gateway_id)
+    return ModelResponse(
+        MessageOut(message=f"Rule for Gateway ID {gateway_id} deleted successfully")
+    )
 
 
-@rules_router.put("/rule-update/{gateway_id}")
+@rules_router.put("/rule-update/{gateway_id}", response_model=RuleMutationOut)
 async def rule_update(
     gateway_id: int,
     rule_schema: RuleSchema,
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
     current_user: UserSchema = Depends(token_verify),
 ):
     if not current_user.admin:
         raise HTTPException(
             status_code=403, detail="User not authorized to update rules"
         )
-    rule = session.query(Rule).filter(Rule.gateway_id == gateway_id).first()  # type: ignore
+    rule = await session.scalar(select(Rule).where(Rule.gateway_id == gateway_id))
     if not rule:
         raise HTTPException(
             status_code=404, detail=f"No rule found for the Gateway ID: {gateway_id}"
@@ -167,46 +605,58 @@ async def rule_update(
     rule.composite_key = rule_schema.composite_key  # type: ignore
     rule.field_paths = rule_schema.field_paths
     rule.tolerance = rule_schema.tolerance
+    rule.normalizers = rule_schema.normalizers
+    rule.version = await bump_version(session)
+    await session.flush()
+    snapshot = RuleOut.model_validate(rule)
+    record_change(session, snapshot.version, gateway_id, snapshot)
+    await session.commit()
+    rule_cache.apply(snapshot.version, gateway_id, snapshot)
+    change_notifier.notify()
 
-    session.commit()
-    session.refresh(rule)
-
-    return {
-        "message": "Rule updated successfully",
-        "rule_id": rule.id,
-        "rule": rule,
-    }
+    return ModelResponse(
+        RuleMutationOut(
+            message="Rule updated successfully", rule_id=snapshot.id, rule=snapshot
+        )
+    )
 
 
-@rules_router.patch("/rule-status/{gateway_id}")
+@rules_router.patch("/rule-status/{gateway_id}", response_model=RuleMutationOut)
 async def update_rule_status(
     gateway_id: int,
     enabled: bool,
-    session: Session = Depends(create_session),
+    session: AsyncSession = Depends(create_session),
     current_user: UserSchema = Depends(token_verify),
 ):
     if not current_user.admin:
         raise HTTPException(
             status_code=403, detail="User not authorized to update rule status"
         )
-    rule = session.query(Rule).filter(Rule.gateway_id == gateway_id).first()  # type: ignore
+    rule = await session.scalar(select(Rule).where(Rule.gateway_id == gateway_id))
     if not rule:
         raise HTTPException(
             status_code=404, detail=f"No rule found for the Gateway ID: {gateway_id}"
         )
 
     rule.enabled = enabled
-    session.commit()
-    session.refresh(rule)
+    rule.version = await bump_version(session)
+    await session.flush()
+    snapshot = RuleOut.model_validate(rule)
+    record_change(session, snapshot.version, gateway_id, snapshot)
+    await session.commit()
+    rule_cache.apply(snapshot.version, gateway_id, snapshot)
+    change_notifier.notify()
 
-    return {
-        "message": f"Rule {'enabled' if enabled else 'disabled'} successfully",
-        "rule_id": rule.id,
-        "rule": rule,
-    }
+    return ModelResponse(
+        RuleMutationOut(
+            message=f"Rule {'enabled' if enabled else 'disabled'} successfully",
+            rule_id=snapshot.id,
+            rule=snapshot,
+        )
+    )
 
 
-@rules_router.get("/definitions")
+@rules_router.get("/definitions", response_model=Dict[str, List[str]])
 async def list_rule_definitions(
     current_user: UserSchema = Depends(token_verify),
 ):
@@ -214,4 +664,4 @@ async def list_rule_definitions(
         raise HTTPException(
             status_code=403, detail="User not authorized to view rule definitions"
         )
-    return RuleSchema.RULE_NAME_DEFINITIONS
+    return ModelResponse(RULE_DEFINITIONS_JSON)
@@ -1,5 +1,6 @@
+from datetime import datetime
 from enum import Enum
-from typing import ClassVar, Dict, List, Literal, Optional
+from typing import ClassVar, Dict, List, Literal, Optional, Union
 
 from fastapi import HTTPException
 from pydantic import (
@@ -11,6 +12,10 @@ from pydantic import (
     model_validator,
 )
 
+from normalizers import validate_normalizers
+
+MAX_BATCH_GATEWAYS = 500
+
 CompositeField = Literal[
     "payment_id",
     "document",
@@ -62,6 +67,10 @@ class LoginSchema(BaseModel):
         from_attributes = True
 
 
+class LogoutSchema(BaseModel):
+    refresh_token: Optional[str] = None
+
+
 class RuleSchema(BaseModel):
     RULE_NAME_DEFINITIONS: ClassVar[dict[str, List[CompositeField]]] = {
         "transaction": ["payment_id", "amount", "date"],
@@ -83,8 +92,9 @@ class RuleSchema(BaseModel):
     rule_name: str
     enabled: bool = True
     composite_key: Optional[List[CompositeField]] = None
-    field_paths: Dict[CompositeField, str]
+    field_paths: Dict[CompositeField, Union[str, List[str]]]
     tolerance: Optional[dict] = None
+    normalizers: Optional[Dict[CompositeField, str]] = None
 
     class Config:
         from_attributes = True
@@ -102,9 +112,13 @@ class RuleSchema(BaseModel):
 
     @field_validator("field_paths")
     @classmethod
-    def no_empty_paths(cls, v: Dict[str, str]) -> Dict[str, str]:
-        for k, path in v.items():
-            if not path or not path.strip():
+    def no_empty_paths(
+        cls, v: Dict[str, Union[str, List[str]]]
+    ) -> Dict[str, Union[str, List[str]]]:
+        for k, paths in v.items():
+            if isinstance(paths, str):
+                paths = [paths]
+            if not paths or any(not path or not path.strip() for path in paths):
                 raise ValueError(f"Empty path for {k}")
         return v
 
@@ -136,6 +150,9 @@ class RuleSchema(BaseModel):
                 f"field_paths contains unsupported keys for '{self.rule_name}': {unexpected_str}"
             )
 
+        if self.normalizers:
+            validate_normalizers(self.normalizers, self.composite_key)
+
         return self
 
 
@@ -143,6 +160,10 @@ class RuleKind(str, Enum):
     transaction = "transaction"
     document = "document"
     document_check_provider = "document_check_provider"
+    reference = "reference"
+    deposit_id = "deposit_id"
+    customer_document_reference = "customer_document_reference"
+    bank_account = "bank_account"
 
 
 class RuleOut(BaseModel):
@@ -153,8 +174,22 @@ class RuleOut(BaseModel):
     rule_name: RuleKind
     enabled: bool
     composite_key: List[str]
-    field_paths: Dict[str, str]
+    field_paths: Dict[str, Union[str, List[str]]]
     tolerance: Optional[dict] = None
+    normalizers: Optional[Dict[str, str]] = None
+    version: int = 1
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class RuleMutationOut(BaseModel):
+    message: str
+    rule_id: int
+    rule: RuleOut
+
+
+class MessageOut(BaseModel):
+    message: str
 
 
 class RuleStatusUpdate(BaseModel):
@@ -162,10 +197,11 @@ class RuleStatusUpdate(BaseModel):
 
 
 class RulesPageSchema(BaseModel):
-    total: int
+    total: Optional[int] = None
     limit: int
     offset: int
     items: List[RuleOut]
+    next_cursor: Optional[str] = None
 
 
 class RulesFilter(BaseModel):
@@ -175,5 +211,50 @@ class RulesFilter(BaseModel):
     q: Optional[str] = Field(None, description="Busca por rule_name/gateway_name")
     limit: int = Field(25, ge=1, le=100)
     offset: int = Field(0, ge=0)
-    order_by: Literal["id", "created_at", "updated_at"] = "id"
+    cursor: Optional[str] = Field(
+        None, description="next_cursor da página anterior; ignora offset"
+    )
+    include_total: bool = Field(
+        True, description="False evita o COUNT(*) em páginas profundas"
+    )
+    order_by: Literal["id", "created_at", "updated_at", "relevance"] = "id"
     order: Literal["asc", "desc"] = "desc"
+
+
+class BulkRowResult(BaseModel):
+    index: int
+    gateway_id: Optional[int] = None
+    status: Literal["inserted", "updated", "error"]
+    detail: Optional[str] = None
+
+
+class BulkImportResult(BaseModel):
+    inserted: int
+    updated: int
+    errors: int
+    results: List[BulkRowResult]
+
+
+class RulesBatchRequest(BaseModel):
+    gateway_ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_GATEWAYS)
+
+
+class RulesBatchSchema(BaseModel):
+    # Todo gateway pedido aparece em rules; os sem regra ficam null e em missing
+    rules: Dict[int, Optional[RuleOut]]
+    missing: List[int]
+
+
+class RuleChangeOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    version: int
+    gateway_id: int
+    op: Literal["upsert", "delete"]
+    rule: Optional[RuleOut] = None
+    changed_at: datetime
+
+
+class RuleChangesSchema(BaseModel):
+    # last_version é o since da próxima chamada (igual ao since se vier vazio)
+    changes: List[RuleChangeOut]
+    last_version: int
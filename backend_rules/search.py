@@ -0,0 +1,47 @@
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    column,
+    func,
+    literal_column,
+    or_,
+    select,
+    table,
+)
+
+from models import Rule
+
+# FTS5 trigram index over rule_name/gateway_name, kept in sync by triggers on
+# rules (see the add_rules_search_index migration). Not part of Base.metadata.
+rules_fts = table("rules_fts", column("rowid"), column("rank"))
+
+# The trigram tokenizer cannot match anything shorter than one trigram
+MIN_FTS_QUERY_LENGTH = 3
+
+
+def apply_search(
+    query: Select, q: str, dialect_name: str
+) -> tuple[Select, ColumnElement | None]:
+    # Returns the filtered query and, when the FTS index was used, a rank
+    # column (lower is better) for relevance ordering.
+    q = q.strip()
+    if dialect_name == "sqlite" and len(q) >= MIN_FTS_QUERY_LENGTH:
+        phrase = '"' + q.replace('"', '""') + '"'
+        matches = (
+            select(rules_fts.c.rowid.label("rule_id"), rules_fts.c.rank.label("rank"))
+            .where(literal_column("rules_fts").op("MATCH")(phrase))
+            .subquery()
+        )
+        return query.join(matches, matches.c.rule_id == Rule.id), matches.c.rank
+
+    # Postgres serves this from the pg_trgm GIN indexes on lower(...)
+    like = f"%{q.lower()}%"
+    return (
+        query.where(
+            or_(
+                func.lower(Rule.rule_name).like(like),
+                func.lower(Rule.gateway_name).like(like),
+            )
+        ),
+        None,
+    )
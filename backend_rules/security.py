@@ -0,0 +1,39 @@
+from hashlib import sha256
+
+import bcrypt
+from fastapi.security import HTTPBearer, OAuth2PasswordBearer
+
+from settings import get_settings
+
+MAX_BCRYPT_BYTES = 72
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login-form")  # type: ignore
+oauth2_refresh_scheme = HTTPBearer(auto_error=True)
+
+
+def _normalize_secret(secret: str) -> bytes:
+    secret_bytes = secret.encode("utf-8")
+    if len(secret_bytes) <= MAX_BCRYPT_BYTES:
+        return secret_bytes
+    # Reduce long inputs deterministically so bcrypt never raises
+    digest = sha256(secret_bytes).hexdigest()
+    return digest.encode("ascii")
+
+
+def hash_password(secret: str) -> str:
+    normalized = _normalize_secret(secret)
+    rounds = get_settings().bcrypt_rounds
+    return bcrypt.hashpw(normalized, bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+
+def verify_password(secret: str, hashed: str) -> bool:
+    normalized = _normalize_secret(secret)
+    return bcrypt.checkpw(normalized, hashed.encode("utf-8"))
+
+
+def needs_rehash(hashed: str) -> bool:
+    # $2b$<cost>$<salt+hash>
+    try:
+        return int(hashed.split("$")[2]) != get_settings().bcrypt_rounds
+    except (IndexError, ValueError):
+        return True
@@ -0,0 +1,102 @@
+import os
+from dataclasses import dataclass, fields, replace
+
+from dotenv import load_dotenv
+
+
+def _parse(raw: str, default: object) -> object:
+    # Cast by the type of the field's default; fields defaulting to None are str
+    if isinstance(default, bool):
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, (int, float)):
+        return type(default)(raw)
+    return raw
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    # Each field is read from the upper-cased environment variable of the same
+    # name (e.g. bcrypt_rounds <- BCRYPT_ROUNDS) by from_env().
+    secret_key: str | None = None
+    algorithm: str = "HS256"
+    access_token_expire_minutes: int = 30
+    refresh_token_expire_days: int = 7
+    # Seconds between reads of revoked_tokens (revocations made by other
+    # workers); < 0 loads once and then trusts local revocations (1 worker)
+    revocation_check_seconds: float = 1.0
+    # Each read re-reads revocations this far back, for transactions that
+    # commit late and for clock skew between workers
+    revocation_overlap_seconds: float = 60.0
+
+    database_url: str = "sqlite:///banco.db"
+    # SQLite: applied as PRAGMAs on every new connection
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    # Negative values are KiB, positive values are pages (SQLite semantics)
+    sqlite_cache_size: int = -64000
+    sqlite_busy_timeout_ms: int = 5000
+    # Server databases (Postgres): connection pool settings
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: bool = True
+
+    # Seconds between rule version checks against the DB; < 0 disables (1 worker)
+    rule_cache_check_seconds: float = 1.0
+    # Load enabled rules into the cache at startup, before serving requests
+    rule_cache_warm_up: bool = False
+    # Authenticated principals cached per token; 0 disables the cache
+    principal_cache_size: int = 10000
+    principal_cache_ttl_seconds: float = 60.0
+    # bcrypt cost factor; stored hashes with another cost are rehashed on login
+    bcrypt_rounds: int = 12
+    bcrypt_workers: int = 2
+    bcrypt_max_pending: int = 32
+    # Login throttling (token buckets): burst size and refill per minute, per
+    # email and per client IP. Backend "memory" is per worker; "db" shares
+    # the buckets through rate_limit_buckets at one write per attempt.
+    login_rate_limit_enabled: bool = True
+    login_rate_limit_backend: str = "memory"
+    login_rate_limit_max_keys: int = 100000
+    login_email_burst: int = 10
+    login_email_per_minute: float = 5.0
+    login_ip_burst: int = 50
+    login_ip_per_minute: float = 30.0
+    # Change feed: DB re-check interval while waiting (sees other workers'
+    # writes) and the longest a long-poll request may wait
+    change_feed_poll_seconds: float = 1.0
+    change_feed_max_wait_seconds: float = 30.0
+    # In-process request/DB/bcrypt/JWT metrics, served as Prometheus text
+    metrics_enabled: bool = True
+
+    @classmethod
+    def from_env(cls, **overrides) -> "Settings":
+        load_dotenv()
+        values = {}
+        for field in fields(cls):
+            raw = os.getenv(field.name.upper())
+            if raw is not None:
+                values[field.name] = _parse(raw, field.default)
+        return replace(cls(**values), **overrides)
+
+
+# Field defaults only; nothing read from the environment
+DEFAULT_SETTINGS = Settings()
+
+_settings: Settings | None = None
+
+
+def get_settings() -> Settings:
+    # Settings of the running app; read from the environment on first use when
+    # no app installed its own (scripts, alembic)
+    global _settings
+    if _settings is None:
+        _settings = Settings.from_env()
+    return _settings
+
+
+def use_settings(settings: Settings) -> Settings:
+    global _settings
+    _settings = settings
+    return settings
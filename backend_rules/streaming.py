@@ -0,0 +1,176 @@
+import codecs
+import json
+import zlib
+from typing import Any, AsyncIterable, AsyncIterator
+
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+# Largest single JSON document kept in the buffer while waiting for its end
+MAX_RECORD_BYTES = 1024 * 1024
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl", "application/ndjson")
+
+# Output is coalesced into chunks of about this size before being sent
+WRITE_CHUNK_BYTES = 64 * 1024
+
+
+def is_ndjson(content_type: str | None) -> bool:
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    return media_type in NDJSON_MEDIA_TYPES
+
+
+async def iter_line_batches(chunks: AsyncIterable[bytes]) -> AsyncIterator[list[bytes]]:
+    # Complete lines grouped per received chunk: callers get batches to work
+    # on without waiting for the rest of the body.
+    buf = b""
+    async for chunk in chunks:
+        buf += chunk
+        lines = buf.split(b"\n")
+        buf = lines.pop()
+        if len(buf) > MAX_RECORD_BYTES:
+            raise ValueError(f"Line exceeds {MAX_RECORD_BYTES} bytes")
+        if lines:
+            yield lines
+    if buf:
+        yield [buf]
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    async for lines in iter_line_batches(chunks):
+        for line in lines:
+            yield line
+
+
+async def iter_ndjson(
+    chunks: AsyncIterable[bytes],
+) -> AsyncIterator[tuple[Any, str | None]]:
+    # One (document, None) or (None, error) per non-blank line, so a bad line
+    # is reported without aborting the rest of the stream.
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line), None
+        except ValueError as exc:
+            yield None, f"Invalid JSON: {exc}"
+
+
+async def iter_json_array(
+    chunks: AsyncIterable[bytes],
+) -> AsyncIterator[tuple[Any, str | None]]:
+    # Incremental parse of a top-level JSON array: items are decoded as soon as
+    # they are complete, so the whole body is never held in memory.
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    # What may come next: "[", an item or "]", an item, or "," / "]"
+    expect = "open"
+    finished = False
+
+    def parse(final: bool) -> tuple[list[Any], int]:
+        nonlocal expect, finished
+        items: list[Any] = []
+        pos, size = 0, len(buf)
+        while pos < size and not finished:
+            char = buf[pos]
+            if char.isspace():
+                pos += 1
+                continue
+            if expect == "open":
+                if char != "[":
+                    raise ValueError("Expected a JSON array")
+                expect = "first"
+                pos += 1
+                continue
+            if expect == "separator":
+                if char == ",":
+                    expect = "item"
+                elif char == "]":
+                    finished = True
+                else:
+                    raise ValueError("Invalid JSON array body: expected ',' or ']'")
+                pos += 1
+                continue
+            if char == "]" and expect == "first":
+                finished = True
+                pos += 1
+                break
+            if char in ",]":
+                raise ValueError(f"Invalid JSON array body: unexpected '{char}'")
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise ValueError("Invalid JSON array body")
+                break
+            if end == size and not final and not isinstance(item, (dict, list, str)):
+                break  # a number/literal may continue in the next chunk
+            items.append(item)
+            expect = "separator"
+            pos = end
+        return items, pos
+
+    async for chunk in chunks:
+        buf += utf8.decode(chunk)
+        items, pos = parse(final=False)
+        buf = buf[pos:]
+        if len(buf) > MAX_RECORD_BYTES:
+            raise ValueError(f"Array item exceeds {MAX_RECORD_BYTES} bytes")
+        for item in items:
+            yield item, None
+    buf += utf8.decode(b"", final=True)
+    items, pos = parse(final=True)
+    for item in items:
+        yield item, None
+    if not finished or buf[pos:].strip():
+        raise ValueError("Invalid JSON array body")
+
+
+def iter_json_records(
+    content_type: str | None, chunks: AsyncIterable[bytes]
+) -> AsyncIterator[tuple[Any, str | None]]:
+    if is_ndjson(content_type):
+        return iter_ndjson(chunks)
+    return iter_json_array(chunks)
+
+
+async def coalesce(
+    lines: AsyncIterable[bytes], chunk_size: int = WRITE_CHUNK_BYTES
+) -> AsyncIterator[bytes]:
+    buf: list[bytes] = []
+    size = 0
+    async for line in lines:
+        buf.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield b"".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield b"".join(buf)
+
+
+async def gzip_stream(
+    chunks: AsyncIterable[bytes], level: int = 6
+) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    # For responses produced while the request body is still being read.
+    # Below ASGI spec 2.4 StreamingResponse runs a disconnect listener that
+    # calls receive() and would swallow the body messages the handler needs;
+    # here a disconnect surfaces through request.stream() instead.
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        except (OSError, ClientDisconnect):
+            return
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,283 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from extractors import invalidate
+from matching import Tolerance, band_join, hash_join, match
+
+
+@pytest.fixture(autouse=True)
+def _clear_compiled():
+    # Every test builds its own rule for gateway 1
+    invalidate()
+    yield
+    invalidate()
+
+
+def make_rule(composite_key, tolerance=None):
+    return SimpleNamespace(
+        gateway_id=1,
+        version=1,
+        composite_key=list(composite_key),
+        field_paths={f: f for f in composite_key},
+        tolerance=tolerance,
+    )
+
+
+def doc(id, **fields):
+    return {"id": id, **fields}
+
+
+def ids(docs):
+    return sorted(d["id"] for d in docs)
+
+
+def pairs(result):
+    return sorted((rc["id"], pay["id"]) for rc, pay in result.matched)
+
+
+def groups(result):
+    return sorted((ids(rcs), ids(pays)) for rcs, pays in result.ambiguous)
+
+
+KEY = ("document", "amount", "date")
+
+
+def test_hash_join_matches_normalized_keys():
+    rule = make_rule(KEY)
+    rcs = [
+        doc("r1", document="123.456.789-00", amount="10.5", date="2026-01-02"),
+        doc("r2", document="999", amount="1", date="2026-01-02"),
+    ]
+    payments = [
+        doc("p1", document="12345678900", amount=10.50, date="02/01/2026"),
+        doc("p2", document="888", amount="1", date="2026-01-02"),
+    ]
+
+    result = hash_join(rule, rcs, payments)
+
+    assert pairs(result) == [("r1", "p1")]
+    assert ids(result.unmatched_rcs) == ["r2"]
+    assert ids(result.unmatched_payments) == ["p2"]
+    assert result.ambiguous == []
+
+
+def test_hash_join_reports_duplicates_on_either_side_as_ambiguous():
+    rule = make_rule(KEY)
+    rcs = [
+        doc("r1", document="1", amount="5", date="2026-01-01"),
+        doc("r2", document="1", amount="5", date="2026-01-01"),
+        doc("r3", document="2", amount="5", date="2026-01-01"),
+    ]
+    payments = [
+        doc("p1", document="1", amount="5", date="2026-01-01"),
+        doc("p2", document="2", amount="5", date="2026-01-01"),
+        doc("p3", document="2", amount="5", date="2026-01-01"),
+    ]
+
+    result = hash_join(rule, rcs, payments)
+
+    assert result.matched == []
+    assert groups(result) == [(["r1", "r2"], ["p1"]), (["r3"], ["p2", "p3"])]
+
+
+def test_hash_join_invalid_keys_are_unmatched():
+    rule = make_rule(KEY)
+    rcs = [
+        doc("r1", document="1", amount="abc", date="2026-01-01"),
+        doc("r2", document="1", date="2026-01-01"),
+    ]
+    payments = [doc("p1", document="1", amount="5", date="not a date")]
+
+    result = hash_join(rule, rcs, payments)
+
+    assert ids(result.unmatched_rcs) == ["r1", "r2"]
+    assert ids(result.unmatched_payments) == ["p1"]
+
+
+@pytest.mark.parametrize(
+    "tolerance, expected",
+    [
+        ({"amount": {"mode": "abs", "value": 0.5}}, [("r1", "p1")]),
+        ({"amount": {"mode": "abs", "value": 0.1}}, []),
+        ({"amount": {"mode": "pct", "value": 1}}, [("r1", "p1")]),
+        ({"amount": {"mode": "pct", "value": 0.1}}, []),
+    ],
+)
+def test_band_join_amount_tolerance(tolerance, expected):
+    rule = make_rule(KEY, {"date_window_days": 0, **tolerance})
+    rcs = [doc("r1", document="1", amount="100.00", date="2026-01-10")]
+    payments = [doc("p1", document="1", amount="100.40", date="2026-01-10")]
+
+    assert pairs(band_join(rule, rcs, payments)) == expected
+
+
+def test_band_join_date_window_and_exact_fields():
+    rule = make_rule(KEY, {"date_window_days": 2})
+    rcs = [
+        doc("r1", document="1", amount="10", date="2026-01-10"),
+        doc("r2", document="1", amount="20", date="2026-01-10"),
+        doc("r3", document="2", amount="30", date="2026-01-10"),
+    ]
+    payments = [
+        doc("p1", document="1", amount="10", date="2026-01-12"),
+        doc("p2", document="1", amount="20", date="2026-01-13"),
+        doc("p3", document="3", amount="30", date="2026-01-10"),
+    ]
+
+    result = band_join(rule, rcs, payments)
+
+    assert pairs(result) == [("r1", "p1")]
+    assert ids(result.unmatched_rcs) == ["r2", "r3"]
+    assert ids(result.unmatched_payments) == ["p2", "p3"]
+
+
+def test_band_join_overlapping_candidates_form_one_ambiguous_group():
+    # r1 and r2 share p2; r3 only reaches p3, which is also r2's candidate:
+    # all of them end up in a single group. r4/p5 are a clean pair.
+    rule = make_rule(KEY, {"amount": {"mode": "abs", "value": 1}})
+    rcs = [
+        doc("r1", document="1", amount="10", date="2026-01-01"),
+        doc("r2", document="1", amount="11", date="2026-01-01"),
+        doc("r3", document="1", amount="13", date="2026-01-01"),
+        doc("r4", document="1", amount="50", date="2026-01-01"),
+    ]
+    payments = [
+        doc("p1", document="1", amount="9", date="2026-01-01"),
+        doc("p2", document="1", amount="10.5", date="2026-01-01"),
+        doc("p3", document="1", amount="12", date="2026-01-01"),
+        doc("p4", document="1", amount="30", date="2026-01-01"),
+        doc("p5", document="1", amount="50.5", date="2026-01-01"),
+    ]
+
+    result = band_join(rule, rcs, payments)
+
+    assert pairs(result) == [("r4", "p5")]
+    assert groups(result) == [(["r1", "r2", "r3"], ["p1", "p2", "p3"])]
+    assert ids(result.unmatched_payments) == ["p4"]
+    assert result.unmatched_rcs == []
+
+
+def test_band_join_single_candidate_claimed_twice_is_ambiguous():
+    rule = make_rule(KEY, {"date_window_days": 1})
+    rcs = [
+        doc("r1", document="1", amount="10", date="2026-01-01"),
+        doc("r2", document="1", amount="10", date="2026-01-03"),
+    ]
+    payments = [doc("p1", document="1", amount="10", date="2026-01-02")]
+
+    result = band_join(rule, rcs, payments)
+
+    assert result.matched == []
+    assert groups(result) == [(["r1", "r2"], ["p1"])]
+
+
+@pytest.mark.parametrize("amount", ["NaN", float("nan"), "inf", "1e20", "-1e17"])
+@pytest.mark.parametrize("tolerance", [None, {"amount": {"mode": "abs", "value": 1}}])
+def test_non_finite_or_out_of_range_amounts_are_unmatched(amount, tolerance):
+    rule = make_rule(KEY, tolerance)
+    rcs = [
+        doc("r1", document="1", amount=amount, date="2026-01-01"),
+        doc("r2", document="1", amount="10", date="2026-01-01"),
+    ]
+    payments = [
+        doc("p1", document="1", amount=amount, date="2026-01-01"),
+        doc("p2", document="1", amount="10", date="2026-01-01"),
+    ]
+
+    result = match(rule, rcs, payments)
+
+    assert pairs(result) == [("r2", "p2")]
+    assert ids(result.unmatched_rcs) == ["r1"]
+    assert ids(result.unmatched_payments) == ["p1"]
+
+
+def brute_force(rule, rcs, payments):
+    # Reference semantics: every RC/payment pair within tolerance is an edge;
+    # a pair matches when each is the other's only edge, and every other
+    # connected component with an edge is ambiguous.
+    tolerance = Tolerance.from_rule(rule.tolerance)
+
+    def within(rc, pay):
+        if rc["document"] != pay["document"]:
+            return False
+        rc_cents = int(Decimal(rc["amount"]) * 100)
+        delta = tolerance.amount_delta(rc_cents)
+        if abs(rc_cents - int(Decimal(pay["amount"]) * 100)) > delta:
+            return False
+        days = (date.fromisoformat(rc["date"]) - date.fromisoformat(pay["date"])).days
+        return abs(days) <= tolerance.date_window_days
+
+    edges = {rc["id"]: [p["id"] for p in payments if within(rc, p)] for rc in rcs}
+    claims = {
+        p["id"]: [r for r, ps in edges.items() if p["id"] in ps] for p in payments
+    }
+
+    matched, ambiguous, seen = [], [], set()
+    for rc_id, pay_ids in edges.items():
+        if len(pay_ids) == 1 and len(claims[pay_ids[0]]) == 1:
+            matched.append((rc_id, pay_ids[0]))
+        elif pay_ids and ("rc", rc_id) not in seen:
+            component, stack = set(), [("rc", rc_id)]
+            while stack:
+                node = stack.pop()
+                if node in component:
+                    continue
+                component.add(node)
+                kind, node_id = node
+                nxt = edges[node_id] if kind == "rc" else claims[node_id]
+                stack.extend(("pay" if kind == "rc" else "rc", n) for n in nxt)
+            seen |= component
+            ambiguous.append(
+                (
+                    sorted(i for k, i in component if k == "rc"),
+                    sorted(i for k, i in component if k == "pay"),
+                )
+            )
+    unmatched_rcs = sorted(r for r, ps in edges.items() if not ps)
+    unmatched_payments = sorted(p for p, rs in claims.items() if not rs)
+    return sorted(matched), sorted(ambiguous), unmatched_rcs, unmatched_payments
+
+
+def random_docs(rng, prefix, count):
+    start = date(2026, 1, 1)
+    return [
+        doc(
+            f"{prefix}{i}",
+            document=str(rng.randint(1, 3)),
+            amount=f"{rng.randint(900, 1100) / 100:.2f}",
+            date=(start + timedelta(days=rng.randint(0, 6))).isoformat(),
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_match_agrees_with_brute_force(seed):
+    rng = random.Random(seed)
+    tolerance = rng.choice(
+        [
+            None,
+            {"date_window_days": rng.randint(0, 2)},
+            {"amount": {"mode": "abs", "value": rng.choice([0.05, 0.2])}},
+            {
+                "date_window_days": rng.randint(0, 2),
+                "amount": {"mode": "pct", "value": rng.choice([0.5, 2])},
+            },
+        ]
+    )
+    rule = make_rule(KEY, tolerance)
+    rcs = random_docs(rng, "r", rng.randint(0, 25))
+    payments = random_docs(rng, "p", rng.randint(0, 25))
+
+    result = match(rule, rcs, payments)
+
+    assert (
+        pairs(result),
+        groups(result),
+        ids(result.unmatched_rcs),
+        ids(result.unmatched_payments),
+    ) == brute_force(rule, rcs, payments)
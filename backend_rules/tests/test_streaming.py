@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from streaming import iter_json_array
+
+
+def parse(body: bytes, chunk_size: int) -> list:
+    async def chunks():
+        for start in range(0, len(body), chunk_size):
+            yield body[start : start + chunk_size]
+
+    async def collect():
+        return [item async for item, _ in iter_json_array(chunks())]
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        (b"[]", []),
+        (b" [ ] ", []),
+        (b'[{"a": 1}]', [{"a": 1}]),
+        (
+            b'[1, 22, "x", [3], {"b": [4, 5]}, null, true]',
+            [1, 22, "x", [3], {"b": [4, 5]}, None, True],
+        ),
+        (b'[\n  {"a": 1},\n  {"a": 2}\n]\n', [{"a": 1}, {"a": 2}]),
+    ],
+)
+def test_iter_json_array_parses_items(body, chunk_size, expected):
+    assert parse(body, chunk_size) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"[1 2]",
+        b'[{"a": 1} {"a": 2}]',
+        b"[,,{}]",
+        b"[,1]",
+        b"[1,,2]",
+        b"[1,]",
+        b"[1",
+        b"[1] 2",
+        b'{"a": 1}',
+    ],
+)
+def test_iter_json_array_rejects_malformed_arrays(body, chunk_size):
+    with pytest.raises(ValueError):
+        parse(body, chunk_size)